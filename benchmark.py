@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
+# ----------
+# usage: python benchmark.py [name ...]
+# ----------
+
+import re
+import sys
+import time
+from regex_builder import RegexBuilder
+
+BENCHMARKS = {}
+
+def benchmark(func):
+    BENCHMARKS[func.__name__] = func
+    return func
+
+def timing(func, *args):
+    start = time.perf_counter()
+    ret = func(*args)
+    return time.perf_counter() - start, ret
+
+def report(name, seconds, count):
+    print('  {:<40} {:>10.3f} ms {:>12.0f} /s'.format(name, seconds * 1000, count / seconds))
+
+
+@benchmark
+def vector_matcher(size=1000000):
+    import numpy
+    builder = RegexBuilder()
+    hex_char = builder.digit() | builder.char_range('a', 'f')
+    for name, expr, values in [
+        ('hex id', hex_char.repeat(16, 16), ['%016x' % (i * 2654435761) for i in range(size)]),
+        ('int_range(100, 999)', builder.int_range(100, 999), [str(i % 1200) for i in range(size)]),
+    ]:
+        expr = expr.reduce()
+        array = numpy.array(values)
+        matcher = expr.vector_matcher()
+        fullmatch = re.compile(expr.compile()).fullmatch
+        print(name)
+        report('re.fullmatch loop', timing(lambda: [fullmatch(v) is not None for v in values])[0], size)
+        report('vector_matcher', timing(matcher, array)[0], size)
+
+
+@benchmark
+def threads(rules=2000):
+    from concurrent.futures import ThreadPoolExecutor
+    builder = RegexBuilder()
+    def build(index):
+        return builder.int_range(index, index * 37 + 1000).reduce().compile()
+
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print('build + reduce + compile {} rules, GIL {}'.format(rules, 'enabled' if gil else 'disabled'))
+    base = None
+    for workers in (1, 2, 4, 8):
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            seconds, _ = timing(lambda: list(executor.map(build, range(rules))))
+        base = base or seconds
+        report('{} threads (x{:.2f})'.format(workers, base / seconds), seconds, rules)
+
+
+@benchmark
+def cli(rules=20000):
+    import io
+    import json
+    from regex_builder.__main__ import run
+    from regex_builder.common import RegexStyle
+    lines = [json.dumps({'id': i, 'expr': {'int_range': [i, i * 37 + 1000]}}) for i in range(rules)]
+    for workers in (1, 4):
+        seconds, _ = timing(run, lines, io.StringIO(), RegexStyle.python, workers)
+        report('python -m regex_builder -j {}'.format(workers), seconds, rules)
+
+
+@benchmark
+def library(lines=5000):
+    import random
+    from regex_builder import library
+    random.seed(0)
+    corpus = '\n'.join(
+        '2024-05-{:02d}T{:02d}:{:02d}:{:02d}.{:03d}Z {} {} "GET /items/{}" {} req={:08x}-0000-4000-8000-{:012x}'.format(
+            random.randint(1, 28), random.randrange(24), random.randrange(60), random.randrange(60),
+            random.randrange(1000), '.'.join(str(random.randrange(256)) for _ in range(4)),
+            random.randrange(65536), random.randrange(10 ** 6), random.choice((200, 301, 404, 500)),
+            random.getrandbits(32), random.getrandbits(48))
+        for _ in range(lines))
+    builder = RegexBuilder()
+    hand_octet = '(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)'
+    for name, hand in [
+        ('ipv4', '(?:{0}\\.){{3}}{0}'.format(hand_octet)),
+        ('port', '[0-9]{1,4}|[1-5][0-9]{4}|6[0-4][0-9]{3}|65[0-4][0-9]{2}|655[0-2][0-9]|6553[0-5]'),
+        ('http_status', '[1-5]\\d\\d'),
+        ('iso8601', '\\d{4}-\\d{2}-\\d{2}T\\d{2}:\\d{2}:\\d{2}(?:\\.\\d+)?(?:Z|[+-]\\d{2}:\\d{2})'),
+        ('uuid', '[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}'),
+        ('hex_id', '[0-9a-fA-F]+'),
+    ]:
+        print(name)
+        candidates = [('library', library.FIELDS[name]().compile()), ('hand-written', hand)]
+        if name == 'ipv4':
+            octet = builder.int_range(0, 255)
+            dot = builder.char('.')
+            built = (octet & dot & octet & dot & octet & dot & octet).reduce().compile()
+            candidates.append(('int_range', built))
+        for label, pattern in candidates:
+            findall = re.compile(pattern).findall
+            seconds = min(timing(findall, corpus)[0] for _ in range(5))
+            report('{} findall'.format(label), seconds, lines)
+
+
+@benchmark
+def alternation_set(size=1000000, updates=20):
+    import random
+    from regex_builder.expr import OrRegexExpr, StringRegexExpr
+    random.seed(0)
+    words = ['{:x}.example{}.com'.format(random.getrandbits(40), i % 97) for i in range(size)]
+    builder = RegexBuilder()
+    seconds, items = timing(builder.alternation_set, words)
+    report('build {} literals'.format(size), seconds, size)
+    seconds, _ = timing(items.compile)
+    report('first compile', seconds, 1)
+    def update():
+        for index in range(updates // 2):
+            items.add('blocked{}.example.org'.format(index))
+            items.remove(words[index])
+    report('{} add/remove'.format(updates), timing(update)[0], updates)
+    report('recompile', timing(items.compile)[0], 1)
+    small = words[:size // 100]
+    rebuild = lambda: OrRegexExpr(*[StringRegexExpr(w) for w in small]).reduce().compile()
+    report('OrRegexExpr rebuild of {} literals'.format(len(small)), timing(rebuild)[0], 1)
+
+
+@benchmark
+def predicate(size=200000):
+    import random
+    from regex_builder import library
+    random.seed(0)
+    builder = RegexBuilder()
+    for name, expr, make in [
+        ('literal', builder.string('application/json'), lambda: random.choice(['application/json', 'text/html'])),
+        ('words', builder.alternation_set(['GET', 'POST', 'PUT', 'DELETE']), lambda: random.choice(['GET', 'HEAD', 'PUT'])),
+        ('int_range(0, 255)', builder.int_range(0, 255), lambda: str(random.randrange(300))),
+        ('int_range(1, 10 ** 9)', builder.int_range(1, 10 ** 9), lambda: str(random.randrange(2 * 10 ** 9))),
+        ('uuid', library.uuid(), lambda: str(__import__('uuid').UUID(int=random.getrandbits(128)))),
+        ('hex_id', library.hex_id(), lambda: '{:x}'.format(random.getrandbits(64))),
+        ('ipv4 (fallback)', library.ipv4(), lambda: '.'.join(str(random.randrange(300)) for _ in range(4))),
+    ]:
+        values = [make() for _ in range(size)]
+        fullmatch = re.compile(expr.reduce().compile()).fullmatch
+        predicate = expr.to_predicate()
+        print(name)
+        report('re.fullmatch', timing(lambda: [fullmatch(v) for v in values])[0], size)
+        report('to_predicate()', timing(lambda: [predicate(v) for v in values])[0], size)
+
+
+@benchmark
+def unicode():
+    import unicodedata
+    from regex_builder.expr import CharsOrRegexExpr
+    from regex_builder.tables import get_unicode_table
+    seconds, table = timing(get_unicode_table)
+    report('load tables', seconds, 1)
+    def scan():
+        codes = [code for code in range(sys.maxunicode + 1) if unicodedata.category(chr(code))[0] == 'L']
+        intervals = [(code, code) for code in codes]
+        return CharsOrRegexExpr.from_intervals(intervals).reduce().compile()
+    report('letters from unicodedata', timing(scan)[0], 1)
+    builder = RegexBuilder()
+    report('unicode_category(L)', timing(lambda: builder.unicode_category('L').reduce().compile())[0], 1)
+
+
+@benchmark
+def extraction(lines=20000):
+    import random
+    random.seed(0)
+    texts = ['GET /item/{} {} {}ms size={}'.format(
+        random.randrange(10 ** 6), random.choice([200, 204, 301, 404, 500]),
+        random.randrange(3000), random.randrange(65536)) for _ in range(lines)]
+    builder = RegexBuilder()
+    expected = sum(1 for text in texts for word in text.replace('/', ' ').replace('=', ' ').replace('ms', '').split()
+                   if word.isdigit() and int(word) <= 65535)
+    for name, expr in [
+        ('int_range(0, 65535)', builder.int_range(0, 65535)),
+        ('longest_first', builder.int_range(0, 65535, longest_first=True)),
+        ('longest_first + boundary', builder.int_range(0, 65535, longest_first=True, boundary=True)),
+    ]:
+        findall = re.compile(expr.reduce().compile()).findall
+        seconds, found = timing(lambda: sum(len(findall(text)) for text in texts))
+        report('{} ({} found, {} expected)'.format(name, found, expected), seconds, lines)
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+    for name in argv[1:] or BENCHMARKS:
+        print('[{}]'.format(name))
+        BENCHMARKS[name]()
+
+if __name__ == '__main__':
+    main()
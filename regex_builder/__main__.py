@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
+# ----------
+# usage: python -m regex_builder [input] [--output FILE] [--style STYLE] [--workers N] [--cache DIR]
+#
+# each input line is a json rule, for example:
+#   {"id": "ipv4", "expr": {"and": [{"int_range": [0, 255]}, {"char": "."}, {"int_range": [0, 255]}]}}
+# each output line is `{"id", "pattern", "ms"}`, or `{"id", "error"}`, in the input order.
+# ----------
+
+import sys
+import json
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .builder import RegexBuilder
+from .common import RegexStyle
+from .expr import RegexExpr, OrRegexExpr, StringRegexExpr
+from .serialize import BuildCache
+
+STYLES = ('python', 'csharp', 're2')
+SPEC_RANGES = ('digit', 'lower_case_letter', 'upper_case_letter', 'dot')
+CHUNK_SIZE = 64 # rules per task, amortize the cost of pickling.
+
+_builder = RegexBuilder()
+_cache = None # the BuildCache of the process.
+
+
+def build_expr(spec) -> RegexExpr:
+    '''
+    build a expr from a json spec, a object with a single key of:
+    `int_range: [min, max]` (with `longest_first`, `boundary`: true or a char class spec, and `leading_zeros`),
+    `char_range: [start, end]`, `char: "c"`, `string: "text"`,
+    `words: ["text", ...]`, `spec: "digit"|"lower_case_letter"|"upper_case_letter"|"dot"`,
+    `and: [spec, ...]`, `or: [spec, ...]`, `repeat: spec` (with `min` and `max`),
+    `group: spec` (with `capture`) or `ignore_case: spec`.
+    '''
+    if not isinstance(spec, dict):
+        raise ValueError('spec must be a object: {!r}'.format(spec))
+    if 'int_range' in spec:
+        boundary = spec.get('boundary')
+        if isinstance(boundary, dict):
+            boundary = build_expr(boundary)
+        return _builder.int_range(*spec['int_range'], longest_first=spec.get('longest_first', False),
+                                  boundary=boundary or None, leading_zeros=spec.get('leading_zeros', False))
+    if 'char_range' in spec:
+        return _builder.char_range(*spec['char_range'])
+    if 'char' in spec:
+        return _builder.char(spec['char'])
+    if 'string' in spec:
+        return _builder.string(spec['string'])
+    if 'words' in spec:
+        return OrRegexExpr(*[StringRegexExpr(word) for word in spec['words']])
+    if 'spec' in spec:
+        if spec['spec'] not in SPEC_RANGES:
+            raise ValueError('unknown spec: {!r}'.format(spec['spec']))
+        return getattr(_builder, spec['spec'])()
+    if 'and' in spec or 'or' in spec:
+        op = '__and__' if 'and' in spec else '__or__'
+        exprs = [build_expr(e) for e in spec.get('and', spec.get('or'))]
+        if not exprs:
+            raise ValueError('empty {}.'.format(op.strip('_')))
+        expr = exprs[0]
+        for other in exprs[1:]:
+            expr = getattr(expr, op)(other)
+        return expr
+    if 'repeat' in spec:
+        return build_expr(spec['repeat']).repeat(spec.get('min', 0), spec.get('max'))
+    if 'group' in spec:
+        return build_expr(spec['group']).group(spec.get('capture', True))
+    if 'ignore_case' in spec:
+        return build_expr(spec['ignore_case']).ignore_case()
+    raise ValueError('unknown spec: {!r}'.format(spec))
+
+
+def _init_worker(cache_dir, cache_size):
+    global _cache
+    _cache = None if cache_dir is None else BuildCache(cache_dir, cache_size)
+
+
+def process(line: str, style: RegexStyle) -> dict:
+    ''' build, reduce and compile a json rule, return the result. '''
+    rule_id = None
+    try:
+        rule = json.loads(line)
+        rule_id = rule.get('id') if isinstance(rule, dict) else None
+        start = time.perf_counter()
+        expr = build_expr(rule['expr'] if isinstance(rule, dict) and 'expr' in rule else rule)
+        if _cache is not None:
+            _, pattern = _cache.build(expr, style)
+        else:
+            pattern = expr.reduce().compile(style)
+        ms = (time.perf_counter() - start) * 1000
+        result = dict(id=rule_id, pattern=pattern, ms=round(ms, 3))
+    except Exception as err: # pylint: disable=W0703
+        result = dict(id=rule_id, error='{}: {}'.format(type(err).__name__, err))
+    return result
+
+
+def process_chunk(lines: list, style: RegexStyle) -> list:
+    return [process(line, style) for line in lines]
+
+
+def _iter_chunks(lines, size: int):
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _iter_lines(fp):
+    for line in fp:
+        if line.strip():
+            yield line
+
+
+def run(lines, output, style: RegexStyle, workers: int=1, cache_dir: str=None,
+        cache_size: int=64 * 1024 * 1024) -> int:
+    '''
+    process the rule lines and write the results in order, return the count of errors.
+    rules are sent to workers in chunks of `CHUNK_SIZE`, at most `workers * 4` chunks are in flight,
+    so the memory does not grow with the input.
+    '''
+    errors = 0
+    def write(result):
+        nonlocal errors
+        if 'error' in result:
+            errors += 1
+        output.write(json.dumps(result, ensure_ascii=False))
+        output.write('\n')
+
+    if workers <= 1:
+        _init_worker(cache_dir, cache_size)
+        for line in lines:
+            write(process(line, style))
+        return errors
+
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(cache_dir, cache_size)) as executor:
+        for chunk in _iter_chunks(lines, CHUNK_SIZE):
+            if len(pending) >= workers * 4:
+                for result in pending.popleft().result():
+                    write(result)
+            pending.append(executor.submit(process_chunk, chunk, style))
+        while pending:
+            for result in pending.popleft().result():
+                write(result)
+    return errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m regex_builder',
+                                     description='build patterns from json-lines rules.')
+    parser.add_argument('input', nargs='?', help='the rules file, default is stdin.')
+    parser.add_argument('-o', '--output', help='the results file, default is stdout.')
+    parser.add_argument('--style', choices=STYLES, default='python')
+    parser.add_argument('-j', '--workers', type=int, default=1, help='the count of worker processes.')
+    parser.add_argument('--cache', metavar='DIR', help='the directory of the build cache.')
+    parser.add_argument('--cache-size', type=int, default=64 * 1024 * 1024,
+                        help='the max size of the build cache in bytes.')
+    args = parser.parse_args(argv)
+
+    source = open(args.input, 'r', encoding='utf-8') if args.input else sys.stdin
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        errors = run(_iter_lines(source), output, getattr(RegexStyle, args.style),
+                     args.workers, args.cache, args.cache_size)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
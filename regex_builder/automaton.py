@@ -0,0 +1,385 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
+# ----------
+# finite automata over unicode code point intervals.
+# ----------
+
+import math
+import random
+from bisect import bisect_right
+from collections import Counter
+
+MAX_CODE = 0x10FFFF
+
+
+class Nfa:
+    ''' a epsilon-nfa, each move is labeled with a tuple of (start, end) intervals. '''
+
+    def __init__(self):
+        self._epsilons = []
+        self._moves = []
+
+    def add_state(self) -> int:
+        self._epsilons.append([])
+        self._moves.append([])
+        return len(self._moves) - 1
+
+    def add_epsilon(self, src: int, dst: int):
+        self._epsilons[src].append(dst)
+
+    def add_move(self, src: int, intervals, dst: int):
+        if intervals:
+            self._moves[src].append((tuple(intervals), dst))
+
+    def closure(self, states) -> frozenset:
+        ''' return the epsilon closure of states. '''
+        ret = set(states)
+        stack = list(ret)
+        while stack:
+            for dst in self._epsilons[stack.pop()]:
+                if dst not in ret:
+                    ret.add(dst)
+                    stack.append(dst)
+        return frozenset(ret)
+
+    def moves(self, states):
+        ''' yield all (start, end, dst) moves from states. '''
+        for state in states:
+            for intervals, dst in self._moves[state]:
+                for start, end in intervals:
+                    yield start, end, dst
+
+
+def _partition(moves):
+    '''
+    split overlapped (start, end, dst) moves into disjoint intervals.
+    yield (start, end, frozenset(dsts)) in order.
+    '''
+    events = []
+    for start, end, dst in moves:
+        events.append((start, 1, dst))
+        events.append((end + 1, -1, dst))
+    events.sort()
+
+    active = Counter()
+    index = 0
+    while index < len(events):
+        pos = events[index][0]
+        while index < len(events) and events[index][0] == pos:
+            _, delta, dst = events[index]
+            active[dst] += delta
+            if not active[dst]:
+                del active[dst]
+            index += 1
+        if active and index < len(events):
+            yield pos, events[index][0] - 1, frozenset(active)
+
+
+class Dfa:
+    '''
+    a trimmed dfa.
+
+    the dfa is immutable, the lazy tables are built locally then published
+    by a single assignment, so it can be shared between threads without locks.
+
+    `transitions[state]` is a sorted list of disjoint (start, end, dst),
+    all states can reach a accept state except the start state of a empty language.
+    '''
+
+    def __init__(self, transitions: list, accepts: list, start: int=0):
+        self._transitions = transitions
+        self._accepts = accepts
+        self._start = start
+        self._order = None
+        self._paths = None
+        self._ways = None
+        self._unrank_table = None
+
+    @classmethod
+    def from_expr(cls, expr):
+        nfa = Nfa()
+        start = nfa.add_state()
+        end = expr._build_nfa(nfa, start)
+        return cls.from_nfa(nfa, start, end)
+
+    @classmethod
+    def from_nfa(cls, nfa: Nfa, start: int, end: int):
+        ''' subset construction. '''
+        sets = [nfa.closure((start, ))]
+        index = {sets[0]: 0}
+        transitions = []
+        accepts = []
+        closures = {}
+        while len(transitions) < len(sets):
+            states = sets[len(transitions)]
+            accepts.append(end in states)
+            row = []
+            for lo, hi, dsts in _partition(nfa.moves(states)):
+                dst_set = closures.get(dsts)
+                if dst_set is None:
+                    dst_set = closures[dsts] = nfa.closure(dsts)
+                dst = index.get(dst_set)
+                if dst is None:
+                    dst = index[dst_set] = len(sets)
+                    sets.append(dst_set)
+                if row and row[-1][2] == dst and row[-1][1] + 1 == lo:
+                    row[-1] = (row[-1][0], hi, dst)
+                else:
+                    row.append((lo, hi, dst))
+            transitions.append(row)
+        return cls._trim(transitions, accepts)
+
+    @classmethod
+    def _trim(cls, transitions, accepts):
+        ''' remove the states which cannot reach any accept state. '''
+        reverse = [[] for _ in transitions]
+        for src, row in enumerate(transitions):
+            for _, _, dst in row:
+                reverse[dst].append(src)
+        live = set(state for state, accept in enumerate(accepts) if accept)
+        stack = list(live)
+        while stack:
+            for src in reverse[stack.pop()]:
+                if src not in live:
+                    live.add(src)
+                    stack.append(src)
+
+        mapping = {0: 0}
+        for state in range(1, len(transitions)):
+            if state in live:
+                mapping[state] = len(mapping)
+        new_transitions = [None] * len(mapping)
+        new_accepts = [None] * len(mapping)
+        for state, new_state in mapping.items():
+            new_transitions[new_state] = [
+                (lo, hi, mapping[dst]) for lo, hi, dst in transitions[state] if dst in live
+            ]
+            new_accepts[new_state] = accepts[state]
+        return cls(new_transitions, new_accepts)
+
+    @property
+    def start(self) -> int:
+        return self._start
+
+    @property
+    def transitions(self) -> list:
+        return self._transitions
+
+    @property
+    def accepts(self) -> list:
+        return self._accepts
+
+    def is_empty(self) -> bool:
+        return not self._accepts[self._start] and not self._transitions[self._start]
+
+    def is_prefix_free(self) -> bool:
+        ''' return whether no accepted string is a proper prefix of another one. '''
+        for accept, row in zip(self._accepts, self._transitions):
+            if accept and row:
+                return False
+        return True
+
+    def intersects_prefixes(self, other) -> bool:
+        '''
+        return whether any accepted string is a prefix of (or equals to) a string accepted by other.
+        '''
+        if other.is_empty():
+            return False
+        # other is trimmed, so all reachable states of other accept some prefixes.
+        start = (self._start, other._start)
+        visited = {start}
+        stack = [start]
+        while stack:
+            left, right = stack.pop()
+            if self._accepts[left]:
+                return True
+            right_row = other._transitions[right]
+            for lo, hi, left_dst in self._transitions[left]:
+                for right_lo, right_hi, right_dst in right_row:
+                    if lo <= right_hi and right_lo <= hi:
+                        pair = (left_dst, right_dst)
+                        if pair not in visited:
+                            visited.add(pair)
+                            stack.append(pair)
+        return False
+
+    def _topological_order(self):
+        '''
+        return states in reverse topological order (successors first),
+        or `None` if there is a cycle (the language is infinite).
+        '''
+        if self._order is None:
+            indegree = [0] * len(self._transitions)
+            for row in self._transitions:
+                for _, _, dst in row:
+                    indegree[dst] += 1
+            queue = [state for state, degree in enumerate(indegree) if not degree]
+            order = []
+            while queue:
+                state = queue.pop()
+                order.append(state)
+                for _, _, dst in self._transitions[state]:
+                    indegree[dst] -= 1
+                    if not indegree[dst]:
+                        queue.append(dst)
+            if len(order) < len(self._transitions):
+                self._order = False
+            else:
+                order.reverse()
+                self._order = order
+        return self._order or None
+
+    def is_finite(self) -> bool:
+        return self._topological_order() is not None
+
+    def _get_paths(self):
+        ''' return the count of accepted strings start from each state. '''
+        if self._paths is None:
+            order = self._topological_order()
+            if order is None:
+                raise ValueError('the language is infinite.')
+            paths = [0] * len(self._transitions)
+            for state in order:
+                total = 1 if self._accepts[state] else 0
+                for lo, hi, dst in self._transitions[state]:
+                    total += (hi - lo + 1) * paths[dst]
+                paths[state] = total
+            self._paths = paths
+        return self._paths
+
+    def count(self):
+        ''' return the count of accepted strings, or `math.inf`. '''
+        if not self.is_finite():
+            return math.inf
+        return self._get_paths()[self._start]
+
+    def max_length(self):
+        ''' return the length of the longest accepted string, or `math.inf`. '''
+        order = self._topological_order()
+        if order is None:
+            return math.inf
+        longest = [0] * len(self._transitions)
+        for state in order:
+            longest[state] = max([longest[dst] + 1 for _, _, dst in self._transitions[state]] or [0])
+        return longest[self._start]
+
+    def _get_ways(self, length: int) -> list:
+        '''
+        return a table that `table[k][state]` is the count of accepted strings
+        which length is `k` start from `state`.
+        '''
+        ways = self._ways
+        if ways is None:
+            ways = [[1 if accept else 0 for accept in self._accepts]]
+        if len(ways) <= length:
+            # never mutate a published table, other threads may read it.
+            ways = list(ways)
+            while len(ways) <= length:
+                prev = ways[-1]
+                ways.append([
+                    sum((hi - lo + 1) * prev[dst] for lo, hi, dst in row) for row in self._transitions
+                ])
+            self._ways = ways
+        return ways
+
+    def last_string(self) -> str:
+        ''' return the last accepted string in shortlex order, the language must be finite and not empty. '''
+        length = self.max_length()
+        ways = self._get_ways(length)
+        chars = []
+        state = self._start
+        for remaining in range(length, 0, -1):
+            for lo, hi, dst in reversed(self._transitions[state]):
+                if ways[remaining - 1][dst]:
+                    chars.append(chr(hi))
+                    state = dst
+                    break
+        return ''.join(chars)
+
+    def iter_strings(self):
+        ''' lazy iterate all accepted strings in shortlex order. '''
+        max_length = self.max_length()
+        length = 0
+        while length <= max_length:
+            yield from self._iter_length(length)
+            length += 1
+
+    def _iter_length(self, length: int):
+        ways = self._get_ways(length)
+        if not ways[length][self._start]:
+            return
+        if length == 0:
+            yield ''
+            return
+
+        def candidates(state, remaining):
+            for lo, hi, dst in self._transitions[state]:
+                if ways[remaining - 1][dst]:
+                    for code in range(lo, hi + 1):
+                        yield code, dst
+
+        chars = []
+        stack = [candidates(self._start, length)]
+        while stack:
+            try:
+                code, state = next(stack[-1])
+            except StopIteration:
+                stack.pop()
+                if chars:
+                    chars.pop()
+                continue
+            chars.append(chr(code))
+            if len(chars) == length:
+                yield ''.join(chars)
+                chars.pop()
+            else:
+                stack.append(candidates(state, length - len(chars)))
+
+    def _get_unrank_table(self):
+        if self._unrank_table is None:
+            paths = self._get_paths()
+            table = []
+            for row in self._transitions:
+                bounds = []
+                edges = []
+                total = 0
+                for lo, hi, dst in row:
+                    total += (hi - lo + 1) * paths[dst]
+                    bounds.append(total)
+                    edges.append((lo, paths[dst], dst))
+                table.append((bounds, edges))
+            self._unrank_table = table
+        return self._unrank_table
+
+    def unrank(self, index: int) -> str:
+        ''' return the accepted string at `index`, `0 <= index < count()`. '''
+        table = self._get_unrank_table()
+        accepts = self._accepts
+        chars = []
+        state = self._start
+        while True:
+            if accepts[state]:
+                if not index:
+                    return ''.join(chars)
+                index -= 1
+            bounds, edges = table[state]
+            pos = bisect_right(bounds, index)
+            if pos:
+                index -= bounds[pos - 1]
+            lo, paths, state = edges[pos]
+            offset, index = divmod(index, paths)
+            chars.append(chr(lo + offset))
+
+    def sample(self, n: int, seed=None) -> list:
+        ''' draw `n` accepted strings uniformly (with replacement). '''
+        if not self.is_finite():
+            raise ValueError('cannot sample uniformly from a infinite language.')
+        total = self.count()
+        if not total:
+            raise ValueError('cannot sample from a empty language.')
+        rand = random.Random(seed)
+        randbelow = rand.randrange
+        unrank = self.unrank
+        return [unrank(randbelow(total)) for _ in range(n)]
@@ -8,13 +8,17 @@
 
 from .common import (
     get_char_code,
+    get_or_create,
     CACHE
 )
 from .expr import (
     RegexExpr,
     CharRegexExpr,
     CharRangeRegexExpr,
+    CharSetRegexExpr,
     StringRegexExpr,
+    LookaroundRegexExpr,
+    AlternationSet,
     EMPTY
 )
 from .spec_ranges import (
@@ -23,6 +27,8 @@ from .spec_ranges import (
     UpperCaseLetterCharRangeRegexExpr,
     DotCharRangeRegexExpr,
 )
+from .expr_abs import ICharRegexExpr
+from .tables import get_unicode_table
 
 class RegexBuilder:
     def char_range(self, start: (str, int), end: (str, int)) -> RegexExpr:
@@ -46,10 +52,43 @@ class RegexBuilder:
     def string(self, text: str) -> RegexExpr:
         return StringRegexExpr(text)
 
+    def alternation_set(self, items=()) -> AlternationSet:
+        ''' return a mutable set of alternatives, items are str or RegexExpr. '''
+        return AlternationSet(items)
+
     def dot(self) -> RegexExpr:
         return CACHE[DotCharRangeRegexExpr]
 
-    def int_range(self, min_value: int, max_value: int) -> RegexExpr:
+    def unicode_category(self, name: str) -> RegexExpr:
+        '''
+        return a expr for a unicode general category,
+        like `Lu`, `Nd`, a major category like `L`, or `LC` for cased letters.
+        '''
+        intervals = get_unicode_table().get_category(name)
+        return get_or_create((__name__, 'category', name), lambda: CharSetRegexExpr(intervals))
+
+    def unicode_script(self, name: str) -> RegexExpr:
+        '''
+        return a expr for the letters, marks and numbers of a script, like `Latin`, `Greek` or `Han`.
+        the supported names are in `tables.SCRIPT_WORDS`.
+        '''
+        intervals = get_unicode_table().get_script(name)
+        return get_or_create((__name__, 'script', name), lambda: CharSetRegexExpr(intervals))
+
+    def int_range(self, min_value: int, max_value: int, *,
+                  longest_first: bool=False, boundary=None, leading_zeros: bool=False) -> RegexExpr:
+        '''
+        return a expr for the decimals of ints in `[min_value, max_value]`, without leading zeros.
+
+        for search and extraction over free text:
+        `longest_first` orders the branches by length descending,
+        so a backtracking engine tries `255` before `25` and `2`.
+        `boundary` adds a negative lookbehind and a negative lookahead,
+        so the match is never a part of a longer number: `True` for digits,
+        or a char class expr, like `builder.digit() | builder.char('.')`.
+        with `boundary`, a number with leading zeros like `007` is rejected,
+        unless `leading_zeros` is True, which accepts any count of leading zeros.
+        '''
         # for example:
         # (0, 255) -> RegexExpr(
         #     [0-9]                   |
@@ -76,55 +115,87 @@ class RegexBuilder:
         #
         if not isinstance(min_value, int) or not isinstance(max_value, int):
             raise TypeError
-        if min_value > max_value:
+        if min_value > max_value or min_value < 0:
             raise ValueError
-        min_value_str = str(min_value)
-        max_value_str = str(max_value)
 
-        expr = EMPTY
-
-        if len(min_value_str) == len(max_value_str):
-            range_1 = range(1, len(min_value_str))
-        else:
-            range_1 = range(0, len(min_value_str))
+        branches = []
+        for length in range(len(str(min_value)), len(str(max_value)) + 1):
+            lo = max(min_value, 10 ** (length - 1) if length > 1 else 0)
+            hi = min(max_value, 10 ** length - 1)
+            branches.extend(self._split_int_range(str(lo), str(hi)))
+        if longest_first:
+            branches.reverse()
 
-        for handling in reversed(range_1):
+        expr = EMPTY
+        for branch in branches:
             cur_expr = EMPTY
-            for ch in min_value_str[0:handling]:
-                cur_expr &= self.char(ch)
-            start = ord(min_value_str[handling])
-            if handling < len(min_value_str) - 1:
-                start += 1
-            cur_expr &= CharRangeRegexExpr(start, '9')
-            for _ in range(handling, len(min_value_str) - 1):
-                cur_expr &= self.digit()
-            expr |= cur_expr
-
-        for length in range(len(min_value_str) + 1, len(max_value_str)):
-            for _ in range(0, length):
-                if _ == 0:
-                    cur_expr = CharRangeRegexExpr('1', '9')
-                else:
+            for start, end in branch:
+                if start == end:
+                    cur_expr &= self.char(start)
+                elif (start, end) == ('0', '9'):
                     cur_expr &= self.digit()
-            expr |= cur_expr
-
-        for handling in range(0, len(max_value_str)):
-            cur_expr = EMPTY
-            if handling == 0:
-                if len(min_value_str) == len(max_value_str):
-                    start = ord(min_value_str[handling]) + 1
                 else:
-                    start = '1'
-            else:
-                start = '0'
-            end = ord(max_value_str[handling])
-            if handling < len(max_value_str) - 1:
-                end -= 1
-            for i in range(0, handling):
-                cur_expr &= self.char(max_value_str[i])
-            cur_expr &= CharRangeRegexExpr(start, end)
-            for i in range(handling + 1, len(max_value_str)):
-                cur_expr &= self.digit()
+                    cur_expr &= CharRangeRegexExpr(start, end)
             expr |= cur_expr
 
+        if leading_zeros:
+            expr = self.char('0').repeat(0) & expr
+        if boundary is not None and boundary is not False:
+            guard = self.digit() if boundary is True else boundary
+            if isinstance(guard, RegexExpr):
+                guard = guard.reduce()
+            if not isinstance(guard, ICharRegexExpr):
+                raise TypeError('boundary must be True or a char class expr.')
+            expr = (
+                LookaroundRegexExpr(guard, ahead=False, negative=True) &
+                expr &
+                LookaroundRegexExpr(guard, ahead=True, negative=True)
+            )
         return expr
+
+    @staticmethod
+    def _split_int_range(lo: str, hi: str) -> list:
+        '''
+        split the decimals of same length in `[lo, hi]` into branches in ascending order,
+        each branch is a list of (start, end) digit ranges.
+        '''
+        size = len(lo)
+        prefix = 0
+        while prefix < size and lo[prefix] == hi[prefix]:
+            prefix += 1
+        head = [(ch, ch) for ch in lo[:prefix]]
+        if prefix == size:
+            return [head]
+        if prefix == size - 1:
+            return [head + [(lo[prefix], hi[prefix])]]
+
+        def digits(count):
+            return [('0', '9')] * count
+
+        branches = []
+        # the branches start with lo[prefix], unless lo[prefix:] is `d00..0`.
+        mid_start = lo[prefix]
+        if lo[prefix + 1:].strip('0'):
+            mid_start = chr(ord(mid_start) + 1)
+            for handling in reversed(range(prefix + 1, size)):
+                start = lo[handling]
+                if handling < size - 1:
+                    start = chr(ord(start) + 1)
+                if start <= '9':
+                    branches.append(head + [(ch, ch) for ch in lo[prefix:handling]] +
+                                    [(start, '9')] + digits(size - handling - 1))
+        # the branches start with hi[prefix], unless hi[prefix:] is `d99..9`.
+        mid_end = hi[prefix]
+        tail = []
+        if hi[prefix + 1:].strip('9'):
+            mid_end = chr(ord(mid_end) - 1)
+            for handling in range(prefix + 1, size):
+                end = hi[handling]
+                if handling < size - 1:
+                    end = chr(ord(end) - 1)
+                if end >= '0':
+                    tail.append(head + [(ch, ch) for ch in hi[prefix:handling]] +
+                                [('0', end)] + digits(size - handling - 1))
+        if mid_start <= mid_end:
+            branches.append(head + [(mid_start, mid_end)] + digits(size - prefix - 1))
+        return branches + tail
@@ -3,18 +3,63 @@
 #
 # Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
 # ----------
+# concurrency model:
 #
+# * shared tables (`CACHE`, `CharRangeRegexExpr.RANGE_VALUE_MAP`) are filled at import,
+#   later lazy entries are only added by `get_or_create` under a lock;
+# * exprs are immutable, the lazy per-expr caches (dfa, first chars) are computed
+#   without locks and published by a single assignment, a race only wastes work;
+# * `ReduceContext` and `CompileContext` are created per call and never shared.
+#
+# so reduce/compile/count/sample are safe from many threads, including free-threaded builds.
 # ----------
 
+import threading
 from io import StringIO
 from enum import Enum
 from collections import namedtuple
+from .expr_abs import merge_intervals
+from .dialect import (
+    UnsupportedSyntaxError,
+    PythonDialect,
+    CSharpDialect,
+    Re2Dialect,
+)
 
 CACHE = {} # a cache reprs for save spaces.
+_CACHE_LOCK = threading.RLock() # a factory may create other entries.
+
+def get_or_create(key, factory):
+    '''
+    return `CACHE[key]`, create it by `factory()` if not exists.
+    `factory` is called at most once for each key.
+    '''
+    try:
+        return CACHE[key]
+    except KeyError:
+        pass
+    with _CACHE_LOCK:
+        if key not in CACHE:
+            CACHE[key] = factory()
+        return CACHE[key]
 
 class RegexStyle:
     python = 1
     csharp = 2
+    re2 = 3 # also rust `regex` and go `regexp`.
+
+
+DIALECTS = {
+    RegexStyle.python: PythonDialect(),
+    RegexStyle.csharp: CSharpDialect(),
+    RegexStyle.re2: Re2Dialect(),
+}
+
+def get_dialect(style: RegexStyle):
+    try:
+        return DIALECTS[style]
+    except KeyError:
+        raise ValueError('unknown style: {!r}'.format(style))
 
 
 class ReduceContext:
@@ -45,6 +90,14 @@ class CompileContext:
     def __init__(self, **kwargs):
         self._buffer = StringIO()
         self._style = kwargs.get('style', RegexStyle.python)
+        self._dialect = get_dialect(self._style)
+        # atomic mode is a optimization, skip it if the engine cannot do it.
+        self._atomic = kwargs.get('atomic', False) and self._dialect.supports_atomic
+        self._follows = {}
+        self._cost_model = kwargs.get('cost_model')
+        self._ascii = kwargs.get('ascii', False)
+        self._alternations = kwargs.get('alternations')
+        self._repeat_product = 1
 
     @property
     def buffer(self):
@@ -54,6 +107,73 @@ class CompileContext:
     def style(self):
         return self._style
 
+    @property
+    def dialect(self):
+        ''' the Dialect of the style, which renders chars and syntax. '''
+        return self._dialect
+
+    @property
+    def cost_model(self):
+        ''' the CostModel for choosing between equivalent renderings, or `None`. '''
+        return self._cost_model
+
+    @property
+    def ascii(self):
+        ''' whether the pattern will be used with ASCII-only matching (e.g. `re.ASCII`). '''
+        return self._ascii
+
+    @property
+    def repeat_product(self) -> int:
+        ''' the product of the counts of the counted repeats (`{n,m}`) which enclose the current node. '''
+        return self._repeat_product
+
+    @repeat_product.setter
+    def repeat_product(self, value: int):
+        self._repeat_product = value
+
+    def render(self, expr) -> str:
+        ''' compile the expr into a string without writing the buffer. '''
+        buffer = self._buffer
+        self._buffer = StringIO()
+        try:
+            expr._compile(self)
+            return self._buffer.getvalue()
+        finally:
+            self._buffer = buffer
+
+    def add_alternation(self, count: int):
+        '''
+        if instrumenting, record the count of alternatives and return the index of the alternation,
+        otherwise return `None`.
+        '''
+        if self._alternations is None:
+            return None
+        self._alternations.append(count)
+        return len(self._alternations) - 1
+
+    @staticmethod
+    def get_alternative_name(alternation: int, index: int) -> str:
+        ''' return the group name of a instrumented alternative. '''
+        return '_a{}_{}'.format(alternation, index)
+
+    @property
+    def atomic(self):
+        ''' whether emit atomic groups and possessive quantifiers where safe. '''
+        return self._atomic
+
+    def get_follow(self, node) -> tuple:
+        '''
+        return the chars which may follow the node, as (start, end) tuples.
+        '''
+        return self._follows.get(id(node), ())
+
+    def add_follow(self, node, follow: tuple):
+        # a node may appear multiple times in the tree.
+        exists = self._follows.get(id(node))
+        if exists:
+            follow = merge_intervals(exists + tuple(follow))
+        self._follows[id(node)] = follow
+
 
 def get_char_code(value) -> int:
     ''' get unicode code point from a char. '''
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
+# ----------
+# cost model for choosing between equivalent renderings.
+# ----------
+
+import re
+import timeit
+
+from .common import RegexStyle
+
+
+class CostModel:
+    '''
+    a linear model of the matching cost, all weights are relative to one literal char test.
+
+    * `char_class`: test one char against a `[...]` with one item.
+    * `class_item`: each extra item in a `[...]`.
+    * `shorthand`: test one char against `\\d`, `\\w` or `\\s`.
+    * `branch`: try one more alternative of a alternation.
+    * `repeat`: the fixed overhead of a counted repeat `{n}`.
+    * `repeat_item`: the factor of the body cost for each iteration of a single char repeat.
+    * `repeat_iteration`: the overhead for each iteration of a multi chars repeat.
+    * `max_expand`: never expand a counted repeat into more copies than this.
+    '''
+
+    WEIGHTS = dict(
+        # calibrated on cpython 3.11
+        literal=1.0,
+        char_class=4.5,
+        class_item=0.1,
+        shorthand=5.0,
+        branch=6.0,
+        repeat=7.0,
+        repeat_item=0.55,
+        repeat_iteration=12.0,
+        max_expand=16,
+    )
+
+    def __init__(self, **weights):
+        for name in weights:
+            if name not in self.WEIGHTS:
+                raise TypeError('unknown weight: {}'.format(name))
+        for name, value in self.WEIGHTS.items():
+            setattr(self, name, weights.get(name, value))
+
+    def __repr__(self):
+        return 'CostModel({})'.format(', '.join(
+            '{}={:.3g}'.format(name, getattr(self, name)) for name in self.WEIGHTS
+        ))
+
+    def class_cost(self, items: int) -> float:
+        return self.char_class + self.class_item * (items - 1)
+
+    def alternation_cost(self, items: int) -> float:
+        ''' the cost of a alternation of `items` single chars, which hit on average. '''
+        return (self.literal + self.branch) * (items + 1) / 2
+
+    def repeat_cost(self, body_cost: float, count: int, single: bool) -> float:
+        ''' the cost of `{count}` repeat of a body which cost `body_cost`. '''
+        if single:
+            return self.repeat + count * body_cost * self.repeat_item
+        return self.repeat + count * (body_cost + self.repeat_iteration)
+
+
+def _measure(pattern: str, text: str, flags: int, number: int) -> float:
+    match = re.compile(pattern, flags).fullmatch
+    return min(timeit.repeat(lambda: match(text), number=number, repeat=5)) / number
+
+
+def _per_piece(piece: str, text: str, *, flags=0, size=1024, number=300) -> float:
+    '''
+    return the time of matching one `piece` against `text`,
+    the call overhead is canceled by the difference of two sizes.
+    '''
+    small = _measure(piece * size, text * size, flags, number)
+    large = _measure(piece * size * 2, text * size * 2, flags, number)
+    return max(large - small, 0) / size
+
+
+def calibrate(*, size=1024, number=300) -> CostModel:
+    '''
+    run micro-benchmarks against the local `re` engine and return a calibrated CostModel.
+    '''
+    def per(piece, text, flags=0):
+        return _per_piece(piece, text, flags=flags, size=size, number=number)
+
+    unit = per('a', 'a') or 1e-12
+    char_class = per('[a-c]', 'b') / unit
+    many_items = per('[0-2e-gk-mp-rx-z]', 'y') / unit
+    shorthand = per('\\d', '5', re.ASCII) / unit
+    alternation = per('(?:xy|zw|ab)', 'ab') / unit
+    repeat_small = per('[a-c]{4}', 'bbbb') / unit
+    repeat_large = per('[a-c]{16}', 'b' * 16) / unit
+    repeat_group = per('(?:ab){8}', 'ab' * 8) / unit
+
+    repeat_item = max(repeat_large - repeat_small, 0) / 12 / (char_class or 1)
+    return CostModel(
+        char_class=char_class,
+        class_item=max(many_items - char_class, 0) / 4,
+        shorthand=shorthand,
+        branch=max(alternation - 2, 0) / 2,
+        repeat=max(repeat_small - 4 * char_class * repeat_item, 0),
+        repeat_item=repeat_item,
+        repeat_iteration=max(repeat_group - 16, 0) / 8,
+    )
+
+
+_COST_MODELS = {
+    RegexStyle.python: CostModel(),
+    RegexStyle.csharp: CostModel(),
+    RegexStyle.re2: CostModel(),
+}
+
+def get_cost_model(style: RegexStyle=RegexStyle.python) -> CostModel:
+    ''' return the cost model which registered for the style. '''
+    return _COST_MODELS[style]
+
+def set_cost_model(style: RegexStyle, model: CostModel):
+    ''' register the cost model for the style, for example `set_cost_model(RegexStyle.python, calibrate())`. '''
+    if not isinstance(model, CostModel):
+        raise TypeError('model must be CostModel type.')
+    _COST_MODELS[style] = model
+
+
+if __name__ == '__main__':
+    print(calibrate())
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
+# ----------
+# escape tables and rendering rules for each regex engine.
+# ----------
+
+import sys
+
+from .expr_abs import Range
+
+
+class UnsupportedSyntaxError(ValueError):
+    ''' raise when a expr cannot be expressed in the dialect. '''
+    pass
+
+
+def _make_escape_map(chars: str) -> dict:
+    return dict((ord(ch), '\\' + ch) for ch in chars)
+
+
+class Dialect:
+    name = None
+
+    # chars which must be escaped outside / inside `[]`.
+    LITERAL_ESCAPE_MAP = _make_escape_map('-^\\.?*+[]{}()|$')
+    CLASS_ESCAPE_MAP = _make_escape_map('-^\\.?*+[]{}()|$')
+    # the shorthands with ASCII-only matching, by the intervals of the class.
+    SHORTHANDS = {
+        (Range(0x30, 0x39), ): '\\d',
+        (Range(0x30, 0x39), Range(0x41, 0x5A), Range(0x5F, 0x5F), Range(0x61, 0x7A)): '\\w',
+        (Range(0x09, 0x0D), Range(0x20, 0x20)): '\\s',
+    }
+    RAW_RANGE_CHARS = frozenset(
+        list(range(ord('0'), ord('9') + 1)) +
+        list(range(ord('A'), ord('Z') + 1)) +
+        list(range(ord('a'), ord('z') + 1))
+    )
+
+    supports_atomic = True
+    supports_possessive = True
+    supports_lookaround = True
+    max_repeat = None
+    max_code = 0x10FFFF
+
+    def unsupported(self, construct: str):
+        raise UnsupportedSyntaxError('{} is not supported by {}.'.format(construct, self.name))
+
+    def check_code(self, code: int):
+        if code > self.max_code:
+            self.unsupported('char U+{:X}'.format(code))
+
+    def escape_text(self, text: str) -> str:
+        if text:
+            self.check_code(max(map(ord, text)))
+        return text.translate(self.LITERAL_ESCAPE_MAP)
+
+    def escape_literal(self, code: int) -> str:
+        ''' render a char outside `[]`. '''
+        self.check_code(code)
+        return self.LITERAL_ESCAPE_MAP.get(code, chr(code))
+
+    def escape_class_char(self, code: int) -> str:
+        ''' render a char inside `[]`. '''
+        self.check_code(code)
+        return self.CLASS_ESCAPE_MAP.get(code, chr(code))
+
+    def escape_range_char(self, code: int) -> str:
+        ''' render a endpoint of a range inside `[]`. '''
+        self.check_code(code)
+        if code in self.RAW_RANGE_CHARS:
+            return chr(code)
+        return self.escape_code(code)
+
+    def escape_code(self, code: int) -> str:
+        raise NotImplementedError(type(self))
+
+    def never(self) -> str:
+        ''' render a pattern which never matches. '''
+        return '(?!)'
+
+    def named_group(self, name: str) -> str:
+        return '(?P<{}>'.format(name)
+
+    def atomic_group(self) -> str:
+        if not self.supports_atomic:
+            self.unsupported('atomic group')
+        return '(?>'
+
+    def lookaround(self, ahead: bool, negative: bool) -> str:
+        if not self.supports_lookaround:
+            self.unsupported('lookaround')
+        return '(?' + ('' if ahead else '<') + ('!' if negative else '=')
+
+    def check_repeat(self, min, max, product: int=1):
+        '''
+        check a counted repeat, `product` is the product of its count and the counts of the enclosing repeats.
+        '''
+        if self.max_repeat is not None:
+            for value in (min, max):
+                if value is not None and value > self.max_repeat:
+                    self.unsupported('repeat count {} (max {})'.format(value, self.max_repeat))
+            if product > self.max_repeat:
+                self.unsupported('nested repeat count {} (max {})'.format(product, self.max_repeat))
+
+
+class PythonDialect(Dialect):
+    name = 'python'
+
+    # `(?>...)` and possessive quantifiers require python 3.11+.
+    supports_atomic = supports_possessive = sys.version_info >= (3, 11)
+
+    def escape_code(self, code: int) -> str:
+        if code > 0xFFFF:
+            return '\\U{:08X}'.format(code)
+        return '\\u{:04X}'.format(code)
+
+
+class CSharpDialect(Dialect):
+    name = 'csharp'
+
+    supports_possessive = False
+    # .NET matches UTF-16 code units, so a char out of BMP cannot be in `[]`.
+    max_code = 0xFFFF
+
+    def escape_code(self, code: int) -> str:
+        return '\\u{:04X}'.format(code)
+
+    def escape_text(self, text: str) -> str:
+        return ''.join(self.escape_literal(ord(ch)) for ch in text)
+
+    def escape_literal(self, code: int) -> str:
+        if code > 0xFFFF: # surrogate pair
+            code -= 0x10000
+            return self.escape_code(0xD800 + (code >> 10)) + self.escape_code(0xDC00 + (code & 0x3FF))
+        return super().escape_literal(code)
+
+    def named_group(self, name: str) -> str:
+        return '(?<{}>'.format(name)
+
+
+class Re2Dialect(Dialect):
+    ''' RE2 and rust `regex`, linear time engines. '''
+    name = 're2'
+
+    supports_atomic = False
+    supports_possessive = False
+    supports_lookaround = False
+    max_repeat = 1000
+
+    # `\s` of RE2 is `[\t\n\f\r ]`, without `\v`.
+    SHORTHANDS = {
+        (Range(0x30, 0x39), ): '\\d',
+        (Range(0x30, 0x39), Range(0x41, 0x5A), Range(0x5F, 0x5F), Range(0x61, 0x7A)): '\\w',
+        (Range(0x09, 0x0A), Range(0x0C, 0x0D), Range(0x20, 0x20)): '\\s',
+    }
+
+    def check_code(self, code: int):
+        super().check_code(code)
+        if 0xD800 <= code <= 0xDFFF:
+            self.unsupported('surrogate U+{:X}'.format(code))
+
+    def escape_code(self, code: int) -> str:
+        return '\\x{{{:X}}}'.format(code)
+
+    def never(self) -> str:
+        # no lookaround, use a empty class.
+        return '[^\\x{0}-\\x{10FFFF}]'
@@ -7,12 +7,14 @@
 # ----------
 
 from io import StringIO
+from bisect import bisect_right
 from collections import (
     namedtuple,
     defaultdict
 )
 from .common import (
     get_char_code,
+    get_dialect,
     RegexStyle,
     ReduceContext,
     CompileContext,
@@ -20,18 +22,20 @@ from .common import (
 )
 from .expr_abs import (
     Range,
+    merge_intervals,
+    intervals_intersect,
     ICharRegexExpr,
     ICharRangeRegexExpr,
     ISingledCharRegexExpr,
     IContinuousCharRangeRegexExpr,
 )
+from .automaton import Nfa, Dfa
+from . import trie
+from .tables import get_casefold_table
 
 ASSERT = True
 
 class RegexExpr:
-    SPEC_CHARS = frozenset('-^\\.?*+[]{}()')
-    ESCAPE_MAP = dict((ord(ch), '\\' + ch) for ch in SPEC_CHARS)
-
     def _has_content(self):
         return True
 
@@ -50,10 +54,30 @@ class RegexExpr:
             raise TypeError
         return AndRegexExpr(self._auto_group(self), self._auto_group(other))
 
-    def compile(self, style: RegexStyle=RegexStyle.python):
+    def compile(self, style: RegexStyle=RegexStyle.python, *,
+                atomic: bool=False, cost_model=None, ascii: bool=False):
+        '''
+        compile the expr to pattern string.
+        raise `UnsupportedSyntaxError` if the expr cannot be expressed in the style,
+        for example `RegexStyle.re2` limits repeat counts to 1000.
+
+        if `atomic` is True, emit atomic groups and possessive quantifiers
+        where backtracking can never produce a different match.
+        ignored if the style does not support them (python before 3.11, re2).
+
+        if `cost_model` is a `CostModel` (see `cost.get_cost_model(style)`),
+        choose the cheapest one from equivalent renderings.
+        `ascii` means the pattern is used with ASCII-only matching,
+        which allows shorthands like `\\d`.
+        '''
         context = CompileContext(
-            style=style
+            style=style,
+            atomic=atomic,
+            cost_model=cost_model,
+            ascii=ascii
         )
+        if context.atomic:
+            self._analyze(context, ())
         self._compile(context)
         return context.buffer.getvalue()
 
@@ -67,16 +91,123 @@ class RegexExpr:
     def _reduce(self, context: ReduceContext):
         return self
 
+    def _iter_children(self):
+        return ()
+
+    def _map_children(self, func):
+        '''
+        return a expr which children are mapped by `func`, or self if nothing changed.
+        '''
+        return self
+
+    def ignore_case(self):
+        '''
+        return a expr which match chars in any case, by rewriting chars into char classes,
+        so only this expr is case-insensitive without `re.IGNORECASE`.
+        '''
+        return self._ignore_case()
+
+    def _ignore_case(self):
+        return self._map_children(lambda expr: expr._ignore_case())
+
+    def _build_nfa(self, nfa: Nfa, start: int) -> int:
+        '''
+        add states for the expr into `nfa` from state `start`, return the end state.
+        '''
+        raise NotImplementedError(type(self))
+
+    def _get_dfa(self) -> Dfa:
+        dfa = self.__dict__.get('_dfa')
+        if dfa is None:
+            dfa = self._dfa = Dfa.from_expr(self)
+        return dfa
+
+    def _get_first_chars(self) -> tuple:
+        '''
+        return (intervals, nullable) that intervals is the chars which may start a match,
+        nullable is whether the expr can match empty string.
+        '''
+        first = self.__dict__.get('_first')
+        if first is None:
+            nfa = Nfa()
+            start = nfa.add_state()
+            end = self._build_nfa(nfa, start)
+            states = nfa.closure((start, ))
+            intervals = merge_intervals((lo, hi) for lo, hi, _ in nfa.moves(states))
+            first = self._first = (intervals, end in states)
+        return first
+
+    def _analyze(self, context: CompileContext, follow: tuple):
+        '''
+        record the chars which may follow each node into context,
+        `follow` is the chars which may follow this expr.
+        '''
+        pass
+
+    def count(self):
+        '''
+        return the count of strings which fullmatch the expr,
+        or `math.inf` if the count is infinite.
+        '''
+        return self._get_dfa().count()
+
+    def enumerate(self):
+        '''
+        lazy iterate all strings which fullmatch the expr in shortlex order.
+        '''
+        return self._get_dfa().iter_strings()
+
+    def sample(self, n: int, seed=None) -> list:
+        '''
+        draw `n` strings which fullmatch the expr uniformly (with replacement).
+        '''
+        return self._get_dfa().sample(n, seed)
+
+    def instrument(self):
+        '''
+        return a `Profiler` which records the hits of each alternative over a sample corpus,
+        then reorder the alternatives by the profile.
+        '''
+        from .profile import Profiler
+        return Profiler(self)
+
+    def vector_matcher(self):
+        '''
+        return a `VectorMatcher` which fullmatch a whole numpy array of strings at once.
+        the expr must be composed of fixed length char classes, requires numpy.
+        '''
+        from .vector import VectorMatcher
+        return VectorMatcher.from_expr(self)
+
+    def to_predicate(self):
+        '''
+        return a function `predicate(text)` which returns a truthy value if the text fullmatch the expr.
+        simple shapes (literals, int ranges, char class runs) are compiled to specialized python code,
+        others use `re.Pattern.fullmatch`.
+        '''
+        predicate = self.__dict__.get('_predicate')
+        if predicate is None:
+            from .predicate import build_predicate
+            predicate = self._predicate = build_predicate(self)
+        return predicate
+
     def group(self, capture=True):
-        return GroupedRegexExpr(self, capture)
+        return GroupedRegexExpr(self._as_operand(), capture)
 
     def repeat(self, min, max=None):
         if min is None and max is None:
             return self
-        return RepeatedRegexExpr(AutoGroupedRegexExpr(self), min, max)
+        return RepeatedRegexExpr(AutoGroupedRegexExpr(self._as_operand()), min, max)
 
     def _auto_group(self, expr):
-        return AutoGroupedRegexExpr(expr)
+        return AutoGroupedRegexExpr(expr._as_operand())
+
+    def _as_operand(self):
+        '''
+        return the expr to compose into a parent expr.
+        parents cache the analysis of the children, so a child must never change.
+        '''
+        return self
 
 
 class _EmptyRegexExpr(RegexExpr):
@@ -89,6 +220,9 @@ class _EmptyRegexExpr(RegexExpr):
     def _compile(self, context: CompileContext):
         pass
 
+    def _build_nfa(self, nfa: Nfa, start: int) -> int:
+        return start
+
 EMPTY = _EmptyRegexExpr()
 CACHE[_EmptyRegexExpr] = EMPTY
 
@@ -107,7 +241,33 @@ class StringRegexExpr(RegexExpr):
         return self._text
 
     def _compile(self, context: CompileContext):
-        context.buffer.write(self._text.translate(self.ESCAPE_MAP))
+        context.buffer.write(context.dialect.escape_text(self._text))
+
+    def _ignore_case(self):
+        table = get_casefold_table()
+        exprs = []
+        text = ''
+        for ch in self._text:
+            intervals = table.fold_intervals((Range(ord(ch), ord(ch)), ))
+            if len(intervals) == 1 and intervals[0].start == intervals[0].end:
+                text += ch
+            else:
+                if text:
+                    exprs.append(StringRegexExpr(text))
+                    text = ''
+                exprs.append(CharsOrRegexExpr.from_intervals(intervals))
+        if not exprs:
+            return self
+        if text:
+            exprs.append(StringRegexExpr(text))
+        return AndRegexExpr(*exprs) if len(exprs) > 1 else exprs[0]
+
+    def _build_nfa(self, nfa: Nfa, start: int) -> int:
+        for ch in self._text:
+            end = nfa.add_state()
+            nfa.add_move(start, (Range(ord(ch), ord(ch)), ), end)
+            start = end
+        return start
 
 
 class CharRegexExpr(RegexExpr, ISingledCharRegexExpr, IContinuousCharRangeRegexExpr):
@@ -122,7 +282,18 @@ class CharRegexExpr(RegexExpr, ISingledCharRegexExpr, IContinuousCharRangeRegexE
         return self._ch
 
     def _compile(self, context: CompileContext):
-        context.buffer.write(self.ESCAPE_MAP.get(self._ch, chr(self._ch)))
+        context.buffer.write(context.dialect.escape_literal(self._ch))
+
+    def _build_nfa(self, nfa: Nfa, start: int) -> int:
+        end = nfa.add_state()
+        nfa.add_move(start, self.get_intervals(), end)
+        return end
+
+    def _ignore_case(self):
+        intervals = get_casefold_table().fold_intervals(self.get_intervals())
+        if intervals == self.get_intervals():
+            return self
+        return CharsOrRegexExpr.from_intervals(intervals)
 
     def has(self, value):
         return value == self._ch
@@ -148,10 +319,6 @@ class CharRegexExpr(RegexExpr, ISingledCharRegexExpr, IContinuousCharRangeRegexE
 
 
 class CharRangeRegexExpr(RegexExpr, IContinuousCharRangeRegexExpr):
-    ORD_0_9 = Range(ord('0'), ord('9'))
-    ORD_A_Z = Range(ord('A'), ord('Z'))
-    ORD_a_z = Range(ord('a'), ord('z'))
-
     RANGE_VALUE_MAP = {}
 
     def __init__(self, start: (str, int), end: (str, int)):
@@ -172,31 +339,28 @@ class CharRangeRegexExpr(RegexExpr, IContinuousCharRangeRegexExpr):
         return self
 
     def __repr__(self):
+        dialect = get_dialect(RegexStyle.python)
         return 'Range({}-{})'.format(
-            self._get_fmt_char(self._range.start),
-            self._get_fmt_char(self._range.end),
+            dialect.escape_range_char(self._range.start),
+            dialect.escape_range_char(self._range.end),
         )
 
-    def _get_fmt_char(self, ch_ord, *, context: CompileContext=None):
-        ret = None
-        for r in (self.ORD_0_9, self.ORD_a_z, self.ORD_A_Z):
-            # pylint: disable=E1101
-            if r.has(ch_ord):
-                ret = chr(ch_ord)
-                break
-            # pylint: enable=E1101
-
-        if ret is None: # generic unicode
-            ret = '\\u' + hex(ch_ord)[2:].upper()
-
-        if ASSERT:
-            assert isinstance(ret, str)
-        return ret
-
     def _compile(self, context: CompileContext):
-        context.buffer.write(self._get_fmt_char(self._range.start, context=context))
+        dialect = context.dialect
+        context.buffer.write(dialect.escape_range_char(self._range.start))
         context.buffer.write('-')
-        context.buffer.write(self._get_fmt_char(self._range.end, context=context))
+        context.buffer.write(dialect.escape_range_char(self._range.end))
+
+    def _build_nfa(self, nfa: Nfa, start: int) -> int:
+        end = nfa.add_state()
+        nfa.add_move(start, self.get_intervals(), end)
+        return end
+
+    def _ignore_case(self):
+        intervals = get_casefold_table().fold_intervals(self.get_intervals())
+        if intervals == self.get_intervals():
+            return self
+        return CharsOrRegexExpr.from_intervals(intervals)
 
     @property
     def range(self):
@@ -285,6 +449,66 @@ class CharRangeRegexExpr(RegexExpr, IContinuousCharRangeRegexExpr):
         return (left, right) if ret is NotImplemented else (ret,)
 
 
+class CharSetRegexExpr(RegexExpr, ICharRangeRegexExpr):
+    '''
+    chars as sorted disjoint Range tuples, for large classes like unicode categories,
+    without a expr object per range.
+    '''
+
+    def __init__(self, intervals):
+        self._intervals = merge_intervals(intervals)
+        assert self._intervals
+        self._starts = tuple(start for start, _ in self._intervals)
+
+    def __repr__(self):
+        return 'CharSet({} ranges)'.format(len(self._intervals))
+
+    def _reduce(self, context: ReduceContext):
+        if context.root_node is self:
+            return CharsOrRegexExpr(self)
+        return self
+
+    def _compile(self, context: CompileContext):
+        dialect = context.dialect
+        for start, end in self._intervals:
+            if start == end:
+                context.buffer.write(dialect.escape_class_char(start))
+            else:
+                context.buffer.write(dialect.escape_range_char(start))
+                context.buffer.write('-')
+                context.buffer.write(dialect.escape_range_char(end))
+
+    def _build_nfa(self, nfa: Nfa, start: int) -> int:
+        end = nfa.add_state()
+        nfa.add_move(start, self._intervals, end)
+        return end
+
+    def _ignore_case(self):
+        intervals = get_casefold_table().fold_intervals(self._intervals)
+        if intervals == self._intervals:
+            return self
+        return CharSetRegexExpr(intervals)
+
+    def has(self, value):
+        index = bisect_right(self._starts, value) - 1
+        return index >= 0 and value <= self._intervals[index].end
+
+    def get_order_code(self) -> int:
+        return self._starts[0]
+
+    def subset(self, other) -> bool:
+        return False
+
+    def superset(self, other) -> bool:
+        return False
+
+    def combine_with(self, other):
+        return CharSetRegexExpr(self._intervals + other.get_intervals())
+
+    def get_intervals(self) -> tuple:
+        return self._intervals
+
+
 class _OpRegexExpr(RegexExpr):
     def __init__(self, *exprs):
         if ASSERT:
@@ -296,6 +520,15 @@ class _OpRegexExpr(RegexExpr):
     def exprs(self):
         return self._exprs
 
+    def _iter_children(self):
+        return self._exprs
+
+    def _map_children(self, func):
+        exprs = tuple(func(expr) for expr in self._exprs)
+        if all(x is y for x, y in zip(exprs, self._exprs)):
+            return self
+        return type(self)(*exprs)
+
     def _reduce_extend_expr(self, context: ReduceContext, cls, expr):
         '''
         reduce and extend expr.
@@ -307,7 +540,9 @@ class _OpRegexExpr(RegexExpr):
                     yield from self._reduce_extend_expr(context, cls, e._reduce(context))
             else:
                 expr = expr._reduce(context)
-                if not expr is EMPTY:
+                if type(expr) is cls:
+                    yield from expr._exprs
+                elif not expr is EMPTY:
                     yield expr
 
 
@@ -321,7 +556,7 @@ class AndRegexExpr(_OpRegexExpr):
             for expr in self._exprs:
                 exprs.extend(self._reduce_extend_expr(scoped, AndRegexExpr, expr))
             for idx, expr in enumerate(exprs):
-                if isinstance(expr, CharRangeRegexExpr):
+                if isinstance(expr, (CharRangeRegexExpr, CharSetRegexExpr)):
                     exprs[idx] = CharsOrRegexExpr(expr)._reduce(scoped)
         if not exprs:
             return EMPTY
@@ -331,8 +566,39 @@ class AndRegexExpr(_OpRegexExpr):
             return AndRegexExpr(*exprs)
 
     def _compile(self, context: CompileContext):
+        if context.cost_model is None:
+            for expr in self._exprs:
+                expr._compile(context)
+            return
+
+        # merge runs of same chars into a counted repeat if it is cheaper.
+        model = context.cost_model
+        pieces = [(context.render(expr), expr) for expr in self._exprs]
+        index = 0
+        while index < len(pieces):
+            text, expr = pieces[index]
+            end = index + 1
+            while end < len(pieces) and pieces[end][0] == text:
+                end += 1
+            count = end - index
+            cost = _estimate_cost(model, expr)
+            if count > 1 and isinstance(expr, ICharRegexExpr) and \
+                _fits_repeat(context, count) and model.repeat_cost(cost, count, True) < count * cost:
+                context.buffer.write('{}{{{}}}'.format(text, count))
+            else:
+                context.buffer.write(text * count)
+            index = end
+
+    def _build_nfa(self, nfa: Nfa, start: int) -> int:
         for expr in self._exprs:
-            expr._compile(context)
+            start = expr._build_nfa(nfa, start)
+        return start
+
+    def _analyze(self, context: CompileContext, follow: tuple):
+        for expr in reversed(self._exprs):
+            expr._analyze(context, follow)
+            first, nullable = expr._get_first_chars()
+            follow = merge_intervals(first + follow) if nullable else first
 
 
 class OrRegexExpr(_OpRegexExpr):
@@ -345,7 +611,7 @@ class OrRegexExpr(_OpRegexExpr):
             for expr in self._exprs:
                 exprs.extend(self._reduce_extend_expr(scoped, OrRegexExpr, expr))
             for idx, expr in enumerate(exprs):
-                if isinstance(expr, CharRangeRegexExpr):
+                if isinstance(expr, (CharRangeRegexExpr, CharSetRegexExpr)):
                     exprs[idx] = CharsOrRegexExpr(expr)._reduce(scoped)
 
         if not exprs:
@@ -358,13 +624,31 @@ class OrRegexExpr(_OpRegexExpr):
         return OrRegexExpr(*exprs)
 
     def _compile(self, context: CompileContext):
-        hasvalue = False
-        for expr in self._exprs:
-            if expr._has_content():
-                if hasvalue:
-                    context.buffer.write('|')
-                hasvalue = True
+        exprs = [expr for expr in self._exprs if expr._has_content()]
+        alternation = context.add_alternation(len(exprs))
+        for index, expr in enumerate(exprs):
+            if index:
+                context.buffer.write('|')
+            if alternation is None:
                 expr._compile(context)
+            else:
+                context.buffer.write(context.dialect.named_group(context.get_alternative_name(alternation, index)))
+                expr._compile(context)
+                context.buffer.write(')')
+
+    def _build_nfa(self, nfa: Nfa, start: int) -> int:
+        # same as `_compile`, the empty exprs are ignored.
+        exprs = [expr for expr in self._exprs if expr._has_content()]
+        if not exprs:
+            return start
+        end = nfa.add_state()
+        for expr in exprs:
+            nfa.add_epsilon(expr._build_nfa(nfa, start), end)
+        return end
+
+    def _analyze(self, context: CompileContext, follow: tuple):
+        for expr in self._exprs:
+            expr._analyze(context, follow)
 
 
 class CharsOrRegexExpr(OrRegexExpr, ICharRegexExpr):
@@ -377,6 +661,15 @@ class CharsOrRegexExpr(OrRegexExpr, ICharRegexExpr):
     def __repr__(self):
         return 'CharOR({})'.format(', '.join(repr(e) for e in self._exprs))
 
+    @classmethod
+    def from_intervals(cls, intervals):
+        ''' create a expr from unicode code (start, end) tuples. '''
+        items = [
+            CharRegexExpr(start) if start == end else CharRangeRegexExpr(start, end)
+            for start, end in intervals
+        ]
+        return cls(*CharRangeRegexExpr.combine(items))
+
     def _reduce(self, context: ReduceContext):
         check = set()
         extend_exprs = []
@@ -392,8 +685,13 @@ class CharsOrRegexExpr(OrRegexExpr, ICharRegexExpr):
 
         exprs = []
 
-        # combine char range exprs:
-        combined_range_exprs = CharRangeRegexExpr.combine(range_exprs)
+        # combine char range exprs, merge all into one set if any is a set:
+        if any(isinstance(expr, CharSetRegexExpr) for expr in range_exprs):
+            combined_range_exprs = [CharSetRegexExpr(
+                [r for expr in range_exprs for r in expr.get_intervals()]
+            )]
+        else:
+            combined_range_exprs = CharRangeRegexExpr.combine(range_exprs)
 
         for expr in combined_range_exprs:
             exprs.append(expr._reduce(context))
@@ -404,11 +702,268 @@ class CharsOrRegexExpr(OrRegexExpr, ICharRegexExpr):
         return CharsOrRegexExpr(*exprs)
 
     def _compile(self, context: CompileContext):
+        model = context.cost_model
+        if model is not None:
+            intervals = self.get_intervals()
+            class_cost = model.class_cost(len(intervals))
+            shorthand = context.dialect.SHORTHANDS.get(intervals) if context.ascii else None
+            if shorthand and model.shorthand < class_cost:
+                context.buffer.write(shorthand)
+                return
+            if all(start == end for start, end in intervals) and \
+                model.alternation_cost(len(intervals)) < class_cost:
+                context.buffer.write('(?:')
+                context.buffer.write('|'.join(context.render(CharRegexExpr(start)) for start, _ in intervals))
+                context.buffer.write(')')
+                return
+
         context.buffer.write('[')
         for expr in self._exprs:
-            expr._compile(context)
+            if isinstance(expr, CharRegexExpr):
+                context.buffer.write(context.dialect.escape_class_char(expr.value))
+            else:
+                expr._compile(context)
         context.buffer.write(']')
 
+    def get_intervals(self) -> tuple:
+        ''' return sorted disjoint unicode code (start, end) tuples of the chars. '''
+        intervals = []
+        for expr in self._exprs:
+            intervals.extend(expr.get_intervals())
+        return merge_intervals(intervals)
+
+    def _build_nfa(self, nfa: Nfa, start: int) -> int:
+        end = nfa.add_state()
+        nfa.add_move(start, self.get_intervals(), end)
+        return end
+
+    def _ignore_case(self):
+        intervals = get_casefold_table().fold_intervals(self.get_intervals())
+        if intervals == self.get_intervals():
+            return self
+        return CharsOrRegexExpr.from_intervals(intervals)
+
+class AlternationSet(RegexExpr):
+    '''
+    a mutable set of alternatives for large and frequently updated lists (e.g. blocklists).
+
+    literals are stored in a persistent radix trie, so `add` and `remove` only copy the path of the literal,
+    and `compile` only renders the copied nodes, the fragments of other nodes are cached on the nodes.
+    other exprs are reduced once when added, keyed by the structural hash.
+
+    the longest literal is preferred when literals share a prefix.
+    a AlternationSet is not thread-safe, share a `snapshot()` instead.
+    `&`, `|`, `repeat()` and `group()` compose a snapshot, so compose again after updates.
+    '''
+
+    def __init__(self, items=(), *, frozen: bool=False):
+        words = []
+        others = {}
+        for item in items:
+            word, key, expr = self._get_item(item)
+            if key is None:
+                words.append(word)
+            else:
+                others[key] = expr
+        self._root = trie.build(words)
+        self._others = others
+        self._frozen = frozen
+        self._snapshot = None
+
+    @classmethod
+    def _create(cls, root, others: dict, frozen: bool):
+        ret = cls(frozen=frozen)
+        ret._root = root
+        ret._others = others
+        return ret
+
+    def __repr__(self):
+        return 'AlternationSet({} items)'.format(len(self))
+
+    @staticmethod
+    def _get_item(item) -> tuple:
+        ''' return (literal, None, None) or (None, structural hash, reduced expr). '''
+        if isinstance(item, str):
+            return item, None, None
+        if not isinstance(item, RegexExpr):
+            raise TypeError('item must be str or RegexExpr type.')
+        expr = item.reduce()
+        if type(expr) is StringRegexExpr:
+            return expr.value, None, None
+        if type(expr) is CharRegexExpr:
+            return chr(expr.value), None, None
+        from .serialize import structural_hash
+        return None, structural_hash(expr), expr
+
+    def _check_mutable(self):
+        if self._frozen:
+            raise TypeError('the AlternationSet is frozen.')
+        self._snapshot = None
+
+    def add(self, item):
+        self._check_mutable()
+        word, key, expr = self._get_item(item)
+        if key is None:
+            self._root = trie.insert(self._root, word)
+        elif key not in self._others:
+            others = dict(self._others) # snapshots share the old one.
+            others[key] = expr
+            self._others = others
+
+    def discard(self, item):
+        self._check_mutable()
+        word, key, _ = self._get_item(item)
+        if key is None:
+            self._root = trie.delete(self._root, word)
+        elif key in self._others:
+            others = dict(self._others)
+            del others[key]
+            self._others = others
+
+    def remove(self, item):
+        if item not in self:
+            raise KeyError(item)
+        self.discard(item)
+
+    def __contains__(self, item):
+        word, key, _ = self._get_item(item)
+        if key is None:
+            return trie.contains(self._root, word)
+        return key in self._others
+
+    def __len__(self):
+        return self._root.size + len(self._others)
+
+    def __iter__(self):
+        ''' iterate the literals (as str) in sorted order, then the other exprs. '''
+        yield from trie.iter_words(self._root)
+        yield from self._iter_others()
+
+    def _iter_others(self):
+        # sorted by the structural hash, so equal sets compile to same pattern.
+        others = self._others
+        return [others[key] for key in sorted(others)]
+
+    def _as_operand(self):
+        # `&`, `|`, `repeat()` and `group()` compose the current items.
+        return self.snapshot()
+
+    def snapshot(self):
+        ''' return a frozen AlternationSet of current items, it shares all nodes with self. '''
+        if self._frozen:
+            return self
+        if self._snapshot is None:
+            self._snapshot = self._create(self._root, self._others, True)
+        return self._snapshot
+
+    def _reduce(self, context: ReduceContext):
+        return self.snapshot()
+
+    def _get_dfa(self) -> Dfa:
+        # the caches of a mutable set would be stale.
+        return RegexExpr._get_dfa(self.snapshot())
+
+    def _get_first_chars(self) -> tuple:
+        return RegexExpr._get_first_chars(self.snapshot())
+
+    def to_predicate(self):
+        return RegexExpr.to_predicate(self.snapshot())
+
+    def _iter_children(self):
+        return tuple(self._iter_others())
+
+    def _map_children(self, func):
+        # same order as `_iter_others()`, `Profile` maps the alternations by the order.
+        others = dict((key, func(self._others[key])) for key in sorted(self._others))
+        if all(others[key] is expr for key, expr in self._others.items()):
+            return self
+        return self._create(self._root, others, True)
+
+    def _ignore_case(self):
+        exprs = [StringRegexExpr(word)._ignore_case() for word in trie.iter_words(self._root)]
+        exprs.extend(expr._ignore_case() for expr in self._iter_others())
+        return OrRegexExpr(*exprs) if exprs else EMPTY
+
+    def _compile(self, context: CompileContext):
+        if not len(self):
+            # a empty set matches nothing, even in a concat.
+            context.buffer.write(context.dialect.never())
+            return
+        parts = []
+        if self._root.size:
+            parts.append(self._render_node(self._root, context.dialect)[0])
+        parts.extend(context.render(expr) for expr in self._iter_others())
+        context.buffer.write('|'.join(parts))
+
+    @classmethod
+    def _render_node(cls, node, dialect) -> tuple:
+        '''
+        return (text, alternation, single) for the strings after the node,
+        `alternation` means the text requires a group before concat,
+        `single` means the text matches a single char.
+        '''
+        fragment = node.fragments.get(dialect.name)
+        if fragment is not None:
+            return fragment
+        chars = []
+        parts = []
+        for label, child in node.edges:
+            if len(label) == 1 and child.is_leaf():
+                chars.append(ord(label))
+                continue
+            text, alternation, _ = cls._render_node(child, dialect)
+            if alternation:
+                text = '(?:' + text + ')'
+            parts.append((dialect.escape_text(label) + text, False, False))
+        if chars:
+            parts.insert(0, (cls._render_chars(chars, dialect), False, True))
+
+        if not parts:
+            fragment = ('', False, False)
+        elif len(parts) == 1:
+            fragment = parts[0]
+        else:
+            fragment = ('|'.join(text for text, _, _ in parts), True, False)
+        if node.terminal and parts:
+            text, alternation, single = fragment
+            fragment = (text + '?' if single else '(?:' + text + ')?', False, False)
+        node.fragments[dialect.name] = fragment
+        return fragment
+
+    @staticmethod
+    def _render_chars(chars: list, dialect) -> str:
+        if len(chars) == 1:
+            return dialect.escape_literal(chars[0])
+        items = []
+        for start, end in merge_intervals((ch, ch) for ch in chars):
+            if end - start > 1:
+                items.append(dialect.escape_range_char(start) + '-' + dialect.escape_range_char(end))
+            else:
+                items.extend(dialect.escape_class_char(ch) for ch in range(start, end + 1))
+        return '[' + ''.join(items) + ']'
+
+    def _build_nfa(self, nfa: Nfa, start: int) -> int:
+        end = nfa.add_state()
+        self._build_node_nfa(nfa, self._root, start, end)
+        for expr in self._iter_others():
+            nfa.add_epsilon(expr._build_nfa(nfa, start), end)
+        return end
+
+    def _build_node_nfa(self, nfa: Nfa, node, state: int, end: int):
+        if node.terminal:
+            nfa.add_epsilon(state, end)
+        for label, child in node.edges:
+            current = state
+            for ch in label:
+                current, prev = nfa.add_state(), current
+                nfa.add_move(prev, (Range(ord(ch), ord(ch)), ), current)
+            self._build_node_nfa(nfa, child, current, end)
+
+    def _analyze(self, context: CompileContext, follow: tuple):
+        for expr in self._others.values():
+            expr._analyze(context, follow)
+
+
 class GroupedRegexExpr(RegexExpr):
     def __init__(self, expr, capture: bool):
         self._expr = expr
@@ -420,22 +975,122 @@ class GroupedRegexExpr(RegexExpr):
     def _reduce(self, context: ReduceContext):
         with context.scope(self) as scoped:
             expr = self._expr._reduce(scoped)
+            if isinstance(expr, (CharRangeRegexExpr, CharSetRegexExpr)):
+                expr = CharsOrRegexExpr(expr)._reduce(scoped)
             if expr is self._expr:
                 return self
             return GroupedRegexExpr(expr, self._capture)
 
+    def _iter_children(self):
+        return (self._expr, )
+
+    def _map_children(self, func):
+        expr = func(self._expr)
+        return self if expr is self._expr else GroupedRegexExpr(expr, self._capture)
+
     def _has_content(self):
         return self._expr._has_content()
 
     def _compile(self, context: CompileContext):
         buffer = context.buffer
         if self._has_content():
-            buffer.write('(')
-            if not self._capture:
-                buffer.write('?:')
+            if self._capture:
+                buffer.write('(')
+            else:
+                buffer.write(context.dialect.atomic_group() if _can_be_atomic(context, self._expr) else '(?:')
             self._expr._compile(context)
             buffer.write(')')
 
+    def _build_nfa(self, nfa: Nfa, start: int) -> int:
+        return self._expr._build_nfa(nfa, start)
+
+    def _analyze(self, context: CompileContext, follow: tuple):
+        self._expr._analyze(context, follow)
+
+
+class LookaroundRegexExpr(RegexExpr):
+    '''
+    zero width assertion `(?=...)`, `(?!...)`, `(?<=...)` or `(?<!...)`.
+
+    the automaton ignores the assertion, so `count()`, `enumerate()` and `sample()`
+    are over the strings without the assertion.
+    '''
+
+    ALL_CHARS = (Range(0, 0x10FFFF), )
+
+    def __init__(self, expr, ahead: bool=True, negative: bool=False):
+        self._expr = expr
+        self._ahead = ahead
+        self._negative = negative
+
+    def __repr__(self):
+        return 'Look{}{}({})'.format(
+            'ahead' if self._ahead else 'behind', 'Not' if self._negative else '', repr(self._expr))
+
+    @property
+    def ahead(self):
+        return self._ahead
+
+    @property
+    def negative(self):
+        return self._negative
+
+    def _reduce(self, context: ReduceContext):
+        with context.scope(self) as scoped:
+            expr = self._expr._reduce(scoped)
+            if isinstance(expr, (CharRangeRegexExpr, CharSetRegexExpr)):
+                expr = CharsOrRegexExpr(expr)._reduce(scoped)
+            if expr is self._expr:
+                return self
+            return LookaroundRegexExpr(expr, self._ahead, self._negative)
+
+    def _iter_children(self):
+        return (self._expr, )
+
+    def _map_children(self, func):
+        expr = func(self._expr)
+        return self if expr is self._expr else LookaroundRegexExpr(expr, self._ahead, self._negative)
+
+    def _compile(self, context: CompileContext):
+        context.buffer.write(context.dialect.lookaround(self._ahead, self._negative))
+        self._expr._compile(context)
+        context.buffer.write(')')
+
+    def _get_probe_chars(self) -> tuple:
+        '''
+        return the chars which the assertion may inspect and decide the match.
+        a lookbehind inspects the chars before it, so any char is assumed.
+        '''
+        if not self._ahead:
+            return self.ALL_CHARS
+        if not self._negative:
+            return self._expr._get_first_chars()[0]
+        if isinstance(self._expr, (CharsOrRegexExpr, ICharRangeRegexExpr)):
+            # a char in the class always fails the assertion.
+            intervals = []
+            prev = 0
+            for start, end in self._expr.get_intervals():
+                if start > prev:
+                    intervals.append(Range(prev, start - 1))
+                prev = end + 1
+            if prev <= 0x10FFFF:
+                intervals.append(Range(prev, 0x10FFFF))
+            return tuple(intervals)
+        return self.ALL_CHARS
+
+    def _build_nfa(self, nfa: Nfa, start: int) -> int:
+        # zero width: the end is the start.
+        # the move to a dead state is trimmed from the dfa,
+        # but keeps the inspected chars in `_get_first_chars`, so the follow analysis is conservative.
+        probe = self._get_probe_chars()
+        if probe:
+            nfa.add_move(start, probe, nfa.add_state())
+        return start
+
+    def _analyze(self, context: CompileContext, follow: tuple):
+        # the assertion succeeds once the body matches, the chars after the body are not consumed by it.
+        self._expr._analyze(context, ())
+
 
 class RepeatedRegexExpr(RegexExpr):
     def __init__(self, expr, min, max):
@@ -463,32 +1118,132 @@ class RepeatedRegexExpr(RegexExpr):
     def _reduce(self, context: ReduceContext):
         with context.scope(self) as scoped:
             expr = self._expr._reduce(scoped)
+            if isinstance(expr, (CharRangeRegexExpr, CharSetRegexExpr)):
+                expr = CharsOrRegexExpr(expr)._reduce(scoped)
             if expr is self._expr:
                 return self
             return RepeatedRegexExpr(expr, self._min, self._max)
 
+    def _iter_children(self):
+        return (self._expr, )
+
+    def _map_children(self, func):
+        expr = func(self._expr)
+        return self if expr is self._expr else RepeatedRegexExpr(expr, self._min, self._max)
+
     def _has_content(self):
         return self._expr._has_content()
 
     def _compile(self, context: CompileContext):
         if self._has_content():
             buffer = context.buffer
-            self._expr._compile(context)
-            if self._max is None:
-                if self._min == 0:
-                    buffer.write('*')
-                    return
-                elif self._min == 1:
-                    buffer.write('?')
-                    return
-            buffer.write('{')
-            if self._min == self._max: # both not None
-                buffer.write(str(self._min))
-            else:
-                buffer.write('' if self._min is None else str(self._min))
-                buffer.write(',')
-                buffer.write('' if self._max is None else str(self._max))
-            buffer.write('}')
+            dialect = context.dialect
+            outer = context.repeat_product
+            count = self._get_count()
+            dialect.check_repeat(self._min, self._max, outer * (count or 1))
+            possessive = context.atomic and self._can_be_possessive(context)
+            # python 3.11 raises `SystemError` on a possessive quantifier over a capture group.
+            quantifier = possessive and dialect.supports_possessive and not _has_capture(self._expr)
+            if possessive and not quantifier:
+                # use a atomic group instead.
+                buffer.write(dialect.atomic_group())
+            expanded = self._get_expanded(context)
+            if expanded is not None:
+                buffer.write(expanded)
+                return
+            context.repeat_product = outer * (count or 1)
+            try:
+                self._expr._compile(context)
+            finally:
+                context.repeat_product = outer
+            self._compile_quantifier(buffer)
+            if possessive:
+                buffer.write('+' if quantifier else ')')
+
+    def _can_be_possessive(self, context: CompileContext) -> bool:
+        '''
+        giving back a iteration makes the next char in first chars of the expr,
+        so backtracking is useless if no follow char can start the expr.
+        '''
+        if self._min == self._max:
+            return False
+        first, nullable = self._expr._get_first_chars()
+        if nullable or not self._expr._get_dfa().is_prefix_free():
+            return False
+        return not intervals_intersect(first, context.get_follow(self))
+
+    def _get_expanded(self, context: CompileContext):
+        '''
+        return the expanded `XX...X` for `X{n}` if it is cheaper, otherwise `None`.
+        '''
+        model = context.cost_model
+        if model is None or self._min != self._max or not 1 < self._max <= model.max_expand:
+            return None
+        expr = self._expr
+        if isinstance(expr, AutoGroupedRegexExpr) and isinstance(expr._expr, (AndRegexExpr, StringRegexExpr)):
+            expr = expr._expr # concat does not require the group.
+        cost = _estimate_cost(model, expr)
+        if cost is None:
+            return None
+        single = isinstance(expr, ICharRegexExpr)
+        if model.repeat_cost(cost, self._max, single) <= self._max * cost:
+            return None
+        return context.render(expr) * self._max
+
+    def _get_count(self):
+        '''
+        return the count which RE2 uses for nesting limits if the quantifier is `{...}`, otherwise `None`.
+        same as RE2, it is the max, or the min if the max is unbounded.
+        '''
+        if self._max is None and (self._min or 0) <= 1:
+            return None
+        if self._max == 1 and not self._min:
+            return None
+        return self._min or 0 if self._max is None else self._max
+
+    def _compile_quantifier(self, buffer):
+        if self._max is None:
+            if self._min == 0:
+                buffer.write('*')
+                return
+            elif self._min == 1:
+                buffer.write('+')
+                return
+        elif self._max == 1 and not self._min:
+            buffer.write('?')
+            return
+        buffer.write('{')
+        if self._min == self._max: # both not None
+            buffer.write(str(self._min))
+        else:
+            # `{,n}` is a literal in some engines (re2).
+            buffer.write(str(self._min or 0))
+            buffer.write(',')
+            buffer.write('' if self._max is None else str(self._max))
+        buffer.write('}')
+
+    def _build_nfa(self, nfa: Nfa, start: int) -> int:
+        min = self._min or 0
+        for _ in range(min):
+            start = self._expr._build_nfa(nfa, start)
+        if self._max is None:
+            loop = nfa.add_state()
+            nfa.add_epsilon(start, loop)
+            nfa.add_epsilon(self._expr._build_nfa(nfa, loop), loop)
+            return loop
+        end = nfa.add_state()
+        nfa.add_epsilon(start, end)
+        for _ in range(min, self._max):
+            start = self._expr._build_nfa(nfa, start)
+            nfa.add_epsilon(start, end)
+        return end
+
+    def _analyze(self, context: CompileContext, follow: tuple):
+        context.add_follow(self, follow)
+        if self._max is None or self._max > 1:
+            first, _ = self._expr._get_first_chars()
+            follow = merge_intervals(first + follow)
+        self._expr._analyze(context, follow)
 
 
 class AutoGroupedRegexExpr(RegexExpr):
@@ -497,6 +1252,10 @@ class AutoGroupedRegexExpr(RegexExpr):
         (AndRegexExpr, OrRegexExpr),
         (RepeatedRegexExpr, OrRegexExpr),
         (RepeatedRegexExpr, AndRegexExpr),
+        (RepeatedRegexExpr, StringRegexExpr),
+        (RepeatedRegexExpr, RepeatedRegexExpr),
+        (AndRegexExpr, AlternationSet),
+        (RepeatedRegexExpr, AlternationSet),
     ])
 
     def __init__(self, expr):
@@ -505,6 +1264,16 @@ class AutoGroupedRegexExpr(RegexExpr):
     def __repr__(self):
         return 'AutoGroup({})'.format(repr(self._expr))
 
+    def _has_content(self):
+        return self._expr._has_content()
+
+    def _iter_children(self):
+        return (self._expr, )
+
+    def _map_children(self, func):
+        expr = func(self._expr)
+        return self if expr is self._expr else AutoGroupedRegexExpr(expr)
+
     def _reduce(self, context: ReduceContext):
         expr = self._expr
         while True:
@@ -520,6 +1289,48 @@ class AutoGroupedRegexExpr(RegexExpr):
 
     def _compile(self, context: CompileContext):
         if self._expr._has_content():
-            context.buffer.write('(?:')
+            context.buffer.write(context.dialect.atomic_group() if _can_be_atomic(context, self._expr) else '(?:')
             self._expr._compile(context)
             context.buffer.write(')')
+
+    def _build_nfa(self, nfa: Nfa, start: int) -> int:
+        return self._expr._build_nfa(nfa, start)
+
+    def _analyze(self, context: CompileContext, follow: tuple):
+        self._expr._analyze(context, follow)
+
+
+def _estimate_cost(model, expr: RegexExpr):
+    '''
+    return the estimated cost of matching expr once, or `None` if unknown.
+    '''
+    if isinstance(expr, (CharRegexExpr, StringRegexExpr)):
+        return model.literal * (len(expr.value) if isinstance(expr, StringRegexExpr) else 1)
+    if isinstance(expr, (CharsOrRegexExpr, ICharRangeRegexExpr)):
+        return model.class_cost(len(expr.get_intervals()))
+    if isinstance(expr, AndRegexExpr):
+        costs = [_estimate_cost(model, e) for e in expr.exprs]
+        return None if None in costs else sum(costs)
+    if isinstance(expr, AutoGroupedRegexExpr):
+        return _estimate_cost(model, expr._expr)
+    return None
+
+
+def _fits_repeat(context: CompileContext, count: int) -> bool:
+    ''' whether a counted repeat `{count}` can be written in the current node. '''
+    max_repeat = context.dialect.max_repeat
+    return max_repeat is None or context.repeat_product * count <= max_repeat
+
+
+def _has_capture(expr: RegexExpr) -> bool:
+    if isinstance(expr, GroupedRegexExpr) and expr._capture:
+        return True
+    return any(_has_capture(e) for e in expr._iter_children())
+
+
+def _can_be_atomic(context: CompileContext, expr: RegexExpr) -> bool:
+    '''
+    if no matched string is a prefix of another one, the group can only end at one position,
+    so backtracking into the group never produce a different match.
+    '''
+    return context.atomic and expr._get_dfa().is_prefix_free()
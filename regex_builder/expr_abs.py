@@ -48,6 +48,12 @@ class ICharRangeRegexExpr(ICharRegexExpr):
         '''
         return NotImplemented
 
+    def get_intervals(self) -> tuple:
+        '''
+        return sorted disjoint unicode code (start, end) tuples of the chars.
+        '''
+        raise NotImplementedError(type(self))
+
 
 Range = namedtuple('Range', ['start', 'end'])
 def _range_has(self, val):
@@ -55,6 +61,35 @@ def _range_has(self, val):
 Range.has = _range_has
 
 
+def merge_intervals(intervals) -> tuple:
+    '''
+    merge (start, end) tuples into sorted disjoint Range tuples.
+    '''
+    ret = []
+    for start, end in sorted(intervals):
+        if ret and start <= ret[-1].end + 1:
+            if end > ret[-1].end:
+                ret[-1] = Range(ret[-1].start, end)
+        else:
+            ret.append(Range(start, end))
+    return tuple(ret)
+
+
+def intervals_intersect(left, right) -> bool:
+    '''
+    return whether two sorted disjoint (start, end) tuples have any common value.
+    '''
+    i = j = 0
+    while i < len(left) and j < len(right):
+        if left[i][1] < right[j][0]:
+            i += 1
+        elif right[j][1] < left[i][0]:
+            j += 1
+        else:
+            return True
+    return False
+
+
 class IContinuousCharRangeRegexExpr(ICharRangeRegexExpr):
     @property
     def range(self):
@@ -63,3 +98,6 @@ class IContinuousCharRangeRegexExpr(ICharRangeRegexExpr):
         for example: CharRange('0', '9').range -> (ord('0'), ord('9'))
         '''
         raise NotImplementedError(type(self))
+
+    def get_intervals(self) -> tuple:
+        return (self.range, )
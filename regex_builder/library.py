@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
+# ----------
+# prebuilt and reduced exprs for common log fields, created on first use.
+#
+# numbers are branched by the leading digits like a trie,
+# so a backtracking engine tries at most one branch at each position.
+# see `python benchmark.py library`.
+# ----------
+
+from functools import wraps
+
+from .common import get_or_create
+from .expr import RegexExpr, AndRegexExpr, OrRegexExpr
+from .builder import RegexBuilder
+
+FIELDS = {}
+
+_builder = RegexBuilder()
+
+
+def field(func):
+    ''' register a factory, the reduced expr is created once and shared. '''
+    key = (__name__, func.__name__)
+    @wraps(func)
+    def get() -> RegexExpr:
+        return get_or_create(key, lambda: func().reduce())
+    FIELDS[func.__name__] = get
+    return get
+
+
+def _either(*exprs) -> RegexExpr:
+    # keep the order, `|` of the exprs nest the OR.
+    return OrRegexExpr(*[e._auto_group(e) for e in exprs])
+
+
+def _digits(count: int) -> RegexExpr:
+    # `[0-9][0-9]` is a little faster than `[0-9]{2}` in python `re`.
+    return AndRegexExpr(*[_builder.digit()] * count) if count > 1 else _builder.digit()
+
+
+def _hex() -> RegexExpr:
+    return _builder.digit() | _builder.char_range('A', 'F') | _builder.char_range('a', 'f')
+
+
+@field
+def ipv4_octet():
+    ''' 0-255 without leading zeros. '''
+    # branch by the first digit, so each position tries at most one branch.
+    b = _builder
+    return _either(
+        b.char('1') & b.digit().repeat(0, 2),
+        b.char('2') & _either(
+            b.char_range('0', '4') & b.digit().repeat(0, 1),
+            b.char('5') & b.char_range('0', '5').repeat(0, 1),
+            b.char_range('6', '9'),
+        ).repeat(0, 1),
+        b.char_range('3', '9') & b.digit().repeat(0, 1),
+        b.char('0'),
+    )
+
+@field
+def ipv4():
+    ''' dotted decimal ipv4 address. '''
+    octet = ipv4_octet()
+    dot = _builder.char('.')
+    return octet & dot & octet & dot & octet & dot & octet
+
+@field
+def port():
+    ''' 0-65535 without leading zeros. '''
+    b = _builder
+    return _either(
+        b.char_range('1', '5') & b.digit().repeat(0, 4),
+        b.char('6') & _either(
+            b.char_range('0', '4') & b.digit().repeat(0, 3),
+            b.char('5') & _either(
+                b.char_range('0', '4') & b.digit().repeat(0, 2),
+                b.char('5') & _either(
+                    b.char_range('0', '2') & b.digit().repeat(0, 1),
+                    b.char('3') & b.char_range('0', '5').repeat(0, 1),
+                    b.char_range('4', '9'),
+                ).repeat(0, 1),
+                b.char_range('6', '9') & b.digit().repeat(0, 1),
+            ).repeat(0, 1),
+            b.char_range('6', '9') & b.digit().repeat(0, 2),
+        ).repeat(0, 1),
+        b.char_range('7', '9') & b.digit().repeat(0, 3),
+        b.char('0'),
+    )
+
+@field
+def http_status():
+    ''' 100-599. '''
+    return _builder.char_range('1', '5') & _digits(2)
+
+@field
+def iso8601():
+    ''' `YYYY-MM-DDThh:mm:ss[.fraction](Z|+hh:mm|-hh:mm)`. '''
+    b = _builder
+    month = _either(b.char('0') & b.char_range('1', '9'), b.char('1') & b.char_range('0', '2'))
+    day = _either(
+        b.char('0') & b.char_range('1', '9'),
+        b.char_range('1', '2') & b.digit(),
+        b.char('3') & b.char_range('0', '1'),
+    )
+    hour = _either(b.char_range('0', '1') & b.digit(), b.char('2') & b.char_range('0', '3'))
+    sixty = b.char_range('0', '5') & b.digit()
+    fraction = (b.char('.') & b.digit().repeat(1)).repeat(0, 1)
+    offset = _either(b.char('Z'), (b.char('+') | b.char('-')) & hour & b.char(':') & sixty)
+    return (
+        _digits(4) & b.char('-') & month & b.char('-') & day & b.char('T') &
+        hour & b.char(':') & sixty & b.char(':') & sixty & fraction & offset
+    )
+
+@field
+def uuid():
+    ''' `8-4-4-4-12` hex digits, any case. '''
+    hex_char = _hex()
+    dash = _builder.char('-')
+    return (
+        hex_char.repeat(8, 8) & dash & hex_char.repeat(4, 4) & dash & hex_char.repeat(4, 4) & dash &
+        hex_char.repeat(4, 4) & dash & hex_char.repeat(12, 12)
+    )
+
+@field
+def hex_id():
+    ''' one or more hex digits, any case. '''
+    return _hex().repeat(1)
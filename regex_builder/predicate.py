@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
+# ----------
+# compile exprs to specialized python predicates.
+#
+# the shapes are tried in order:
+# * small finite languages (literals, words, small int ranges): `text in {...}`;
+# * int ranges: length check, `str.isdigit` and int comparison;
+# * fixed length char classes: `bytes.translate` to a mask if the classes are ASCII,
+#   otherwise slice compare and `str.strip` per run of same class;
+# * a single repeated char class: length check and `str.strip`;
+# * otherwise (or with lookarounds): `re.compile(pattern).fullmatch`.
+# see `python benchmark.py predicate`.
+# ----------
+
+import re
+
+from .expr_abs import ICharRangeRegexExpr
+from .expr import (
+    RegexExpr,
+    CharsOrRegexExpr,
+    GroupedRegexExpr,
+    RepeatedRegexExpr,
+    AutoGroupedRegexExpr,
+    LookaroundRegexExpr,
+)
+from .vector import get_branches
+
+MAX_SET_SIZE = 4096
+MAX_CLASS_SIZE = 1024
+ORD_0 = ord('0')
+ORD_9 = ord('9')
+
+
+class _Generator:
+    ''' collect the constants and the conditions of the predicate. '''
+
+    def __init__(self, name: str):
+        self.name = name
+        self.namespace = {}
+        self.conditions = []
+
+    def constant(self, value) -> str:
+        for name, exists in self.namespace.items():
+            if type(exists) is type(value) and exists == value:
+                return name
+        name = '_c{}'.format(len(self.namespace))
+        self.namespace[name] = value
+        return name
+
+    def build(self):
+        source = 'def predicate(text):\n    return {}\n'.format(' and '.join(self.conditions) or 'True')
+        namespace = dict(self.namespace)
+        exec(compile(source, '<predicate {}>'.format(self.name), 'exec'), namespace)
+        predicate = namespace['predicate']
+        predicate.source = source
+        return predicate
+
+
+def _try_finite_set(gen: _Generator, dfa) -> bool:
+    count = dfa.count()
+    if count > MAX_SET_SIZE:
+        return False
+    if count == 1:
+        gen.conditions.append('text == {!r}'.format(next(dfa.iter_strings())))
+    else:
+        gen.conditions.append('text in {}'.format(gen.constant(frozenset(dfa.iter_strings()))))
+    return True
+
+
+def _try_int_range(gen: _Generator, dfa) -> bool:
+    '''
+    a set of canonical decimals which min is `lo`, max is `hi` and count is `hi - lo + 1`
+    must be all ints in `[lo, hi]`.
+    '''
+    for row in dfa.transitions:
+        for lo, hi, _ in row:
+            if lo < ORD_0 or hi > ORD_9:
+                return False
+    # no leading zero: '0' from the start state must be the end.
+    for lo, hi, dst in dfa.transitions[dfa.start]:
+        if lo == ORD_0 and dfa.transitions[dst]:
+            return False
+    first = next(dfa.iter_strings())
+    if not first:
+        return False
+    lo, hi = int(first), int(dfa.last_string())
+    if dfa.count() != hi - lo + 1:
+        return False
+    lo, hi = str(lo), str(hi)
+    gen.conditions.append('{} <= len(text) <= {}'.format(len(lo), len(hi)))
+    gen.conditions.append('text.isascii() and text.isdigit()')
+    gen.conditions.append("(text[0] != '0' or len(text) == 1)" if lo == '0' else "text[0] != '0'")
+    # canonical decimals of same length compare like ints.
+    if lo not in ('0', '1' + '0' * (len(lo) - 1)):
+        gen.conditions.append('(len(text) > {} or text >= {!r})'.format(len(lo), lo))
+    if hi != '9' * len(hi):
+        gen.conditions.append('(len(text) < {} or text <= {!r})'.format(len(hi), hi))
+    return True
+
+
+def _get_chars(intervals) -> str:
+    ''' return the chars of the intervals, or `None` if too many. '''
+    if sum(end - start + 1 for start, end in intervals) > MAX_CLASS_SIZE:
+        return None
+    return ''.join(chr(code) for start, end in intervals for code in range(start, end + 1))
+
+
+def _try_fixed(gen: _Generator, expr: RegexExpr) -> bool:
+    try:
+        branches = get_branches(expr)
+    except ValueError:
+        return False
+    if len(branches) != 1:
+        return False
+    positions = branches[0]
+    if _try_ascii_mask(gen, positions):
+        return True
+    conditions = ['len(text) == {}'.format(len(positions))]
+    # split into runs of same intervals, join adjacent literal chars.
+    runs = []
+    for intervals in positions:
+        if runs and runs[-1][0] == intervals:
+            runs[-1][1] += 1
+        else:
+            runs.append([intervals, 1])
+    literal = ''
+    pos = 0
+    for intervals, size in runs:
+        if len(intervals) == 1 and intervals[0][0] == intervals[0][1]:
+            literal += chr(intervals[0][0]) * size
+            pos += size
+            continue
+        if literal:
+            conditions.append(_compare(pos - len(literal), literal))
+            literal = ''
+        chars = _get_chars(intervals)
+        if chars is None:
+            return False
+        name = gen.constant(chars)
+        if size == 1:
+            conditions.append('text[{}] in {}'.format(pos, name))
+        else:
+            conditions.append('not text[{}:{}].strip({})'.format(pos, pos + size, name))
+        pos += size
+    if literal:
+        conditions.append(_compare(pos - len(literal), literal))
+    gen.conditions.extend(conditions)
+    return True
+
+
+def _try_ascii_mask(gen: _Generator, positions: list) -> bool:
+    '''
+    if the classes are ASCII and disjoint, map each char to the first char of its class
+    by `bytes.translate`, then compare with the mask once.
+    a char out of the classes is never mapped and never equals a first char.
+    '''
+    classes = sorted(set(positions))
+    if max(end for intervals in classes for _, end in intervals) >= 0x80:
+        return False
+    table = bytearray(range(0x80))
+    owners = {}
+    for intervals in classes:
+        for start, end in intervals:
+            for code in range(start, end + 1):
+                if owners.setdefault(code, intervals) is not intervals:
+                    return False
+                table[code] = intervals[0][0]
+    table.extend(range(0x80, 0x100))
+    mask = bytes(intervals[0][0] for intervals in positions)
+    gen.conditions.append('len(text) == {}'.format(len(positions)))
+    gen.conditions.append('text.isascii()')
+    gen.conditions.append('text.encode().translate({}) == {}'.format(gen.constant(bytes(table)), gen.constant(mask)))
+    return True
+
+
+def _compare(start: int, literal: str) -> str:
+    if len(literal) == 1:
+        return 'text[{}] == {!r}'.format(start, literal)
+    return 'text[{}:{}] == {!r}'.format(start, start + len(literal), literal)
+
+
+def _unwrap(expr: RegexExpr) -> RegexExpr:
+    while isinstance(expr, (GroupedRegexExpr, AutoGroupedRegexExpr)):
+        expr = expr._expr
+    return expr
+
+
+def _try_class_run(gen: _Generator, expr: RegexExpr) -> bool:
+    expr = _unwrap(expr)
+    if not isinstance(expr, RepeatedRegexExpr):
+        return False
+    item = _unwrap(expr._expr)
+    if not isinstance(item, (CharsOrRegexExpr, ICharRangeRegexExpr)):
+        return False
+    chars = _get_chars(item.get_intervals())
+    if chars is None:
+        return False
+    min, max = expr._min or 0, expr._max
+    if max is None:
+        if min:
+            gen.conditions.append('len(text) >= {}'.format(min))
+    else:
+        gen.conditions.append('{} <= len(text) <= {}'.format(min, max))
+    gen.conditions.append('not text.strip({})'.format(gen.constant(chars)))
+    return True
+
+
+def _has_lookaround(expr: RegexExpr) -> bool:
+    # the automaton ignores lookarounds.
+    return isinstance(expr, LookaroundRegexExpr) or any(_has_lookaround(e) for e in expr._iter_children())
+
+
+def build_predicate(expr: RegexExpr):
+    '''
+    return a function `predicate(text)` which returns a truthy value if the text fullmatch the expr.
+    the generated source is in `predicate.source` if it is not a `re.Pattern.fullmatch`.
+    '''
+    expr = expr.reduce()
+    if _has_lookaround(expr):
+        return re.compile(expr.compile()).fullmatch
+    gen = _Generator(type(expr).__name__)
+    dfa = expr._get_dfa()
+    if dfa.is_finite() and (_try_finite_set(gen, dfa) or _try_int_range(gen, dfa)):
+        return gen.build()
+    if _try_fixed(gen, expr) or _try_class_run(gen, expr):
+        return gen.build()
+    return re.compile(expr.compile()).fullmatch
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
+# ----------
+# profile-guided alternation reordering.
+# ----------
+
+import re
+import json
+
+from .common import CompileContext
+from .expr import RegexExpr, OrRegexExpr, _has_capture
+
+PROFILE_VERSION = 2 # 2: `attempts` is renamed to `inferred_attempts`.
+
+
+class Profile:
+    '''
+    per-alternative hit and inferred attempt counts of each alternation,
+    alternations are indexed by the order they are compiled.
+    '''
+
+    def __init__(self, pattern: str, alternations: list):
+        self._pattern = pattern
+        self._alternations = alternations
+
+    @property
+    def pattern(self) -> str:
+        ''' the (not instrumented) pattern of the profiled expr. '''
+        return self._pattern
+
+    @property
+    def alternations(self) -> list:
+        '''
+        a list of `{'hits': [...], 'inferred_attempts': [...]}`.
+        attempts are not measured, they are inferred from the matches, see `Profiler`.
+        '''
+        return self._alternations
+
+    def to_dict(self) -> dict:
+        return dict(version=PROFILE_VERSION, pattern=self._pattern, alternations=self._alternations)
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        if data.get('version') != PROFILE_VERSION:
+            raise ValueError('unsupported profile version: {!r}'.format(data.get('version')))
+        return cls(data['pattern'], data['alternations'])
+
+    def save(self, path: str):
+        with open(path, 'w', encoding='utf-8') as fp:
+            json.dump(self.to_dict(), fp, indent=2, sort_keys=True)
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, 'r', encoding='utf-8') as fp:
+            return cls.from_dict(json.load(fp))
+
+    def apply(self, expr: RegexExpr) -> RegexExpr:
+        '''
+        return a expr which hot alternatives come first.
+        only the alternations which alternatives are mutually exclusive are reordered.
+        '''
+        if expr.compile() != self._pattern:
+            raise ValueError('the profile does not match the expr.')
+        counter = [0]
+        return self._reorder(expr, counter)
+
+    def _reorder(self, expr: RegexExpr, counter: list) -> RegexExpr:
+        # visit alternations in same order as `OrRegexExpr._compile`.
+        if type(expr) is not OrRegexExpr:
+            return expr._map_children(lambda e: self._reorder(e, counter))
+        hits = self._alternations[counter[0]]['hits']
+        counter[0] += 1
+        exprs = [self._reorder(e, counter) for e in expr.exprs if e._has_content()]
+        if is_mutually_exclusive(exprs):
+            order = sorted(range(len(exprs)), key=lambda i: -hits[i])
+            exprs = [exprs[i] for i in order]
+        return OrRegexExpr(*exprs)
+
+
+def is_mutually_exclusive(exprs: list) -> bool:
+    '''
+    return whether no string matched by a expr is a prefix of a string matched by another one,
+    so at most one expr can match at any position and the order of them does not matter.
+    '''
+    if any(_has_capture(e) for e in exprs): # reorder will renumber the groups.
+        return False
+    dfas = [e._get_dfa() for e in exprs]
+    for i, left in enumerate(dfas):
+        for j, right in enumerate(dfas):
+            if i != j and left.intersects_prefixes(right):
+                return False
+    return True
+
+
+class Profiler:
+    '''
+    compile the expr with a named group for each alternative,
+    then record which alternatives participated in matches over a sample corpus.
+
+    only the matches are recorded:
+    `inferred_attempts` counts the hit alternative and the ones before it in each match,
+    the tries at the positions where no match starts (so the texts which never match) are not counted.
+    for a alternation in a repeat, a match records one hit, to the first alternative
+    which matched in any iteration (`re` keeps the groups of the earlier iterations),
+    so the hits are undercounted.
+
+    a profiler accumulates counts, use one profiler per thread.
+    '''
+
+    METHODS = ('search', 'match', 'fullmatch')
+
+    def __init__(self, expr: RegexExpr):
+        self._expr = expr
+        self._sizes = []
+        context = CompileContext(alternations=self._sizes)
+        expr._compile(context)
+        self._instrumented = context.buffer.getvalue()
+        self._regex = re.compile(self._instrumented)
+        self._names = [
+            [context.get_alternative_name(alternation, index) for index in range(size)]
+            for alternation, size in enumerate(self._sizes)
+        ]
+        self._profile = Profile(expr.compile(), [
+            dict(hits=[0] * size, inferred_attempts=[0] * size) for size in self._sizes
+        ])
+
+    @property
+    def pattern(self) -> str:
+        ''' the instrumented pattern. '''
+        return self._instrumented
+
+    @property
+    def profile(self) -> Profile:
+        return self._profile
+
+    def feed(self, texts, method: str='search'):
+        '''
+        record the matches of the texts, `method` is one of `search` (all matches), `match` and `fullmatch`.
+        '''
+        if method not in self.METHODS:
+            raise ValueError('method must be one of {}.'.format(self.METHODS))
+        regex = self._regex
+        for text in texts:
+            if method == 'search':
+                for match in regex.finditer(text):
+                    self._record(match)
+            else:
+                match = getattr(regex, method)(text)
+                if match is not None:
+                    self._record(match)
+        return self
+
+    def _record(self, match):
+        groups = match.groupdict()
+        for names, stats in zip(self._names, self._profile.alternations):
+            for index, name in enumerate(names):
+                if groups[name] is not None:
+                    # all alternatives before the hit one were attempted and failed.
+                    stats['hits'][index] += 1
+                    for attempted in range(index + 1):
+                        stats['inferred_attempts'][attempted] += 1
+                    break
+
+    def reorder(self) -> RegexExpr:
+        ''' return a expr which hot alternatives come first. '''
+        return self._profile.apply(self._expr)
@@ -0,0 +1,421 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
+# ----------
+# compact binary serialization of expr trees and a on-disk build cache.
+# ----------
+
+import os
+import zlib
+import hashlib
+import tempfile
+import threading
+
+from .common import RegexStyle, CACHE
+from . import trie
+from .expr import (
+    RegexExpr,
+    CharRegexExpr,
+    CharRangeRegexExpr,
+    CharSetRegexExpr,
+    StringRegexExpr,
+    AndRegexExpr,
+    OrRegexExpr,
+    CharsOrRegexExpr,
+    GroupedRegexExpr,
+    RepeatedRegexExpr,
+    AutoGroupedRegexExpr,
+    LookaroundRegexExpr,
+    AlternationSet,
+    EMPTY,
+)
+from .spec_ranges import (
+    DigitCharRangeRegexExpr,
+    LowerCaseLetterCharRangeRegexExpr,
+    UpperCaseLetterCharRangeRegexExpr,
+    DotCharRangeRegexExpr,
+)
+
+MAGIC = b'RXB'
+VERSION = 1
+
+# node tags, never reuse a value.
+TAG_REF = 0
+TAG_EMPTY = 1
+TAG_CHAR = 2
+TAG_RANGE = 3
+TAG_STRING = 4
+TAG_AND = 5
+TAG_OR = 6
+TAG_CHARS_OR = 7
+TAG_GROUP = 8
+TAG_REPEAT = 9
+TAG_AUTO_GROUP = 10
+TAG_SPEC = 11
+TAG_ALTERNATION_SET = 12
+TAG_CHAR_SET = 13
+TAG_LOOKAROUND = 14
+
+# the singletons in spec_ranges, append only.
+SPEC_TYPES = (
+    DigitCharRangeRegexExpr,
+    LowerCaseLetterCharRangeRegexExpr,
+    UpperCaseLetterCharRangeRegexExpr,
+    DotCharRangeRegexExpr,
+)
+
+OP_TAGS = {
+    AndRegexExpr: TAG_AND,
+    OrRegexExpr: TAG_OR,
+    CharsOrRegexExpr: TAG_CHARS_OR,
+}
+
+
+def _write_varint(buffer: bytearray, value: int):
+    while value > 0x7F:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _read_varint(data, pos: int) -> tuple:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _optional_int(value) -> int:
+    return 0 if value is None else value + 1
+
+
+class _Writer:
+    def __init__(self):
+        self._buffer = bytearray(MAGIC)
+        self._buffer.append(VERSION)
+        self._keys = {}      # id(expr) -> (expr, structural key)
+        self._interned = {}  # structural key -> key id
+        self._written = {}   # key id -> node index
+        self._count = 0
+
+    def getvalue(self) -> bytes:
+        return bytes(self._buffer)
+
+    def _get_key(self, expr: RegexExpr) -> int:
+        '''
+        hash-consing: structurally equal exprs get the same key id.
+        '''
+        item = self._keys.get(id(expr))
+        if item is not None:
+            return item[1]
+        tag, payload, children = self._describe(expr)
+        key = (tag, payload, tuple(self._get_key(e) for e in children))
+        key_id = self._interned.setdefault(key, len(self._interned))
+        self._keys[id(expr)] = (expr, key_id) # keep expr alive, so id is not reused.
+        return key_id
+
+    def _describe(self, expr: RegexExpr) -> tuple:
+        ''' return (tag, payload, children). '''
+        if expr is EMPTY:
+            return TAG_EMPTY, (), ()
+        if type(expr) in SPEC_TYPES:
+            return TAG_SPEC, (SPEC_TYPES.index(type(expr)), ), ()
+        if type(expr) is CharRegexExpr:
+            return TAG_CHAR, (expr.value, ), ()
+        if type(expr) is CharRangeRegexExpr:
+            return TAG_RANGE, (expr.range.start, expr.range.end - expr.range.start), ()
+        if type(expr) is CharSetRegexExpr:
+            # count, then each range: delta of start from prev end, size - 1.
+            payload = [len(expr.get_intervals())]
+            prev = 0
+            for start, end in expr.get_intervals():
+                payload.extend((start - prev, end - start))
+                prev = end
+            return TAG_CHAR_SET, tuple(payload), ()
+        if type(expr) is StringRegexExpr:
+            return TAG_STRING, (expr.value, ), ()
+        if type(expr) in OP_TAGS:
+            return OP_TAGS[type(expr)], (len(expr.exprs), ), expr.exprs
+        if type(expr) is GroupedRegexExpr:
+            return TAG_GROUP, (int(expr._capture), ), (expr._expr, )
+        if type(expr) is RepeatedRegexExpr:
+            return TAG_REPEAT, (_optional_int(expr._min), _optional_int(expr._max)), (expr._expr, )
+        if type(expr) is AutoGroupedRegexExpr:
+            return TAG_AUTO_GROUP, (), (expr._expr, )
+        if type(expr) is LookaroundRegexExpr:
+            return TAG_LOOKAROUND, (int(expr.ahead), int(expr.negative)), (expr._expr, )
+        if type(expr) is AlternationSet:
+            items = [StringRegexExpr(item) if isinstance(item, str) else item for item in expr.snapshot()]
+            return TAG_ALTERNATION_SET, (len(items), ), tuple(items)
+        raise TypeError('cannot serialize {}.'.format(type(expr).__name__))
+
+    def write(self, expr: RegexExpr):
+        buffer = self._buffer
+        key_id = self._get_key(expr)
+        index = self._written.get(key_id)
+        if index is not None:
+            _write_varint(buffer, TAG_REF)
+            _write_varint(buffer, index)
+            return
+
+        tag, payload, children = self._describe(expr)
+        _write_varint(buffer, tag)
+        if tag == TAG_STRING:
+            data = payload[0].encode('utf-8', 'surrogatepass')
+            _write_varint(buffer, len(data))
+            buffer.extend(data)
+        else:
+            for value in payload:
+                _write_varint(buffer, value)
+        for child in children:
+            self.write(child)
+        # index by completion order, same as the reader.
+        self._written[key_id] = self._count
+        self._count += 1
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError('not a serialized expr.')
+        if data[len(MAGIC)] != VERSION:
+            raise ValueError('unsupported version: {}.'.format(data[len(MAGIC)]))
+        self._data = data
+        self._pos = len(MAGIC) + 1
+        self._nodes = []
+
+    def _varint(self) -> int:
+        value, self._pos = _read_varint(self._data, self._pos)
+        return value
+
+    def read(self) -> RegexExpr:
+        tag = self._varint()
+        if tag == TAG_REF:
+            return self._nodes[self._varint()]
+
+        if tag == TAG_EMPTY:
+            expr = EMPTY
+        elif tag == TAG_SPEC:
+            expr = CACHE[SPEC_TYPES[self._varint()]]
+        elif tag == TAG_CHAR:
+            expr = CharRegexExpr(self._varint())
+        elif tag == TAG_RANGE:
+            start = self._varint()
+            expr = CharRangeRegexExpr(start, start + self._varint())
+        elif tag == TAG_CHAR_SET:
+            intervals = []
+            prev = 0
+            size = self._varint()
+            if not size:
+                raise ValueError('empty char set.')
+            for _ in range(size):
+                start = prev + self._varint()
+                prev = start + self._varint()
+                intervals.append((start, prev))
+            expr = CharSetRegexExpr(intervals)
+        elif tag == TAG_STRING:
+            size = self._varint()
+            data = self._data[self._pos:self._pos + size]
+            self._pos += size
+            expr = StringRegexExpr(bytes(data).decode('utf-8', 'surrogatepass'))
+        elif tag in (TAG_AND, TAG_OR, TAG_CHARS_OR):
+            cls = {TAG_AND: AndRegexExpr, TAG_OR: OrRegexExpr, TAG_CHARS_OR: CharsOrRegexExpr}[tag]
+            size = self._varint()
+            expr = cls(*[self.read() for _ in range(size)])
+        elif tag == TAG_GROUP:
+            capture = bool(self._varint())
+            expr = GroupedRegexExpr(self.read(), capture)
+        elif tag == TAG_REPEAT:
+            min = self._varint() - 1
+            max = self._varint() - 1
+            expr = RepeatedRegexExpr(
+                self.read(),
+                None if min < 0 else min,
+                None if max < 0 else max
+            )
+        elif tag == TAG_AUTO_GROUP:
+            expr = AutoGroupedRegexExpr(self.read())
+        elif tag == TAG_LOOKAROUND:
+            ahead = bool(self._varint())
+            negative = bool(self._varint())
+            expr = LookaroundRegexExpr(self.read(), ahead, negative)
+        elif tag == TAG_ALTERNATION_SET:
+            size = self._varint()
+            items = [self.read() for _ in range(size)]
+            # the items are reduced when added, restore them as is.
+            words = [item.value for item in items if type(item) is StringRegexExpr]
+            others = dict((structural_hash(item), item) for item in items if type(item) is not StringRegexExpr)
+            expr = AlternationSet._create(trie.build(words), others, True)
+        else:
+            raise ValueError('unknown tag: {}.'.format(tag))
+        self._nodes.append(expr)
+        return expr
+
+    def read_all(self) -> RegexExpr:
+        expr = self.read()
+        if self._pos != len(self._data):
+            raise ValueError('unexpected trailing data.')
+        return expr
+
+
+def dumps(expr: RegexExpr) -> bytes:
+    ''' serialize a expr tree, structurally equal subtrees are written once. '''
+    writer = _Writer()
+    writer.write(expr)
+    return writer.getvalue()
+
+
+def loads(data: bytes) -> RegexExpr:
+    ''' deserialize a expr tree from `dumps()`. '''
+    return _Reader(memoryview(data)).read_all()
+
+
+def structural_hash(expr: RegexExpr) -> str:
+    ''' return a hex digest which is equal for structurally equal exprs. '''
+    return hashlib.sha256(dumps(expr)).hexdigest()
+
+
+class BuildCache:
+    '''
+    a on-disk cache of reduced exprs and compiled patterns (per RegexStyle),
+    keyed by the structural hash of the spec expr.
+
+    the least recently used entries are evicted when the total size exceeds `max_size` bytes.
+    entries are replaced atomically, so a cache directory can be shared by threads and processes.
+    each entry ends with a crc32 of the content, a broken entry is a cache miss.
+    '''
+
+    MAGIC = b'RXC'
+    SUFFIX = '.rxc'
+
+    def __init__(self, directory: str, max_size: int=64 * 1024 * 1024):
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._size = sum(size for _, _, size in self._iter_entries())
+
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+    def _iter_entries(self):
+        ''' yield (path, mtime, size). '''
+        for name in os.listdir(self._directory):
+            if name.endswith(self.SUFFIX):
+                path = os.path.join(self._directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError: # removed by other process
+                    continue
+                yield path, stat.st_mtime, stat.st_size
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self._directory, key + self.SUFFIX)
+
+    def _load(self, path: str):
+        ''' return (reduced expr, {style: pattern}) or `None`. '''
+        try:
+            with open(path, 'rb') as fp:
+                data = fp.read()
+            os.utime(path) # mark as recently used.
+        except FileNotFoundError:
+            return None
+        try:
+            return self._parse(data)
+        # broken file, the constructors may also raise `TypeError` or `AssertionError`.
+        except (IndexError, KeyError, ValueError, TypeError, AssertionError, RecursionError):
+            return None
+
+    def _parse(self, data: bytes):
+        data, crc = data[:-4], data[-4:]
+        if zlib.crc32(data).to_bytes(4, 'little') != crc:
+            return None
+        if data[:len(self.MAGIC)] != self.MAGIC or data[len(self.MAGIC)] != VERSION:
+            return None
+        pos = len(self.MAGIC) + 1
+        size, pos = _read_varint(data, pos)
+        tree = data[pos:pos + size]
+        pos += size
+        tree = loads(tree) # validate
+        patterns = {}
+        count, pos = _read_varint(data, pos)
+        for _ in range(count):
+            style, pos = _read_varint(data, pos)
+            size, pos = _read_varint(data, pos)
+            patterns[style] = data[pos:pos + size].decode('utf-8', 'surrogatepass')
+            pos += size
+        return tree, patterns
+
+    def _save(self, path: str, tree: bytes, patterns: dict):
+        buffer = bytearray(self.MAGIC)
+        buffer.append(VERSION)
+        _write_varint(buffer, len(tree))
+        buffer.extend(tree)
+        _write_varint(buffer, len(patterns))
+        for style, pattern in sorted(patterns.items()):
+            data = pattern.encode('utf-8', 'surrogatepass')
+            _write_varint(buffer, style)
+            _write_varint(buffer, len(data))
+            buffer.extend(data)
+        buffer.extend(zlib.crc32(buffer).to_bytes(4, 'little'))
+
+        # write a temp file then rename, so readers never see a partial file.
+        fd, temp = tempfile.mkstemp(dir=self._directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(buffer)
+        try:
+            old_size = os.stat(path).st_size # replaced when a style is added.
+        except FileNotFoundError:
+            old_size = 0
+        os.replace(temp, path)
+        with self._lock:
+            self._size += len(buffer) - old_size
+            if self._size > self._max_size:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted(self._iter_entries(), key=lambda x: x[1])
+        total = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if total <= self._max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._size = total
+
+    def build(self, expr: RegexExpr, style: RegexStyle=RegexStyle.python) -> tuple:
+        '''
+        return (reduced expr, compiled pattern) of the expr,
+        load from the cache if exists, otherwise build and store it.
+        '''
+        path = self._get_path(structural_hash(expr))
+        entry = self._load(path)
+        if entry is not None:
+            reduced, patterns = entry
+            if style in patterns:
+                return reduced, patterns[style]
+            tree = dumps(reduced)
+        else:
+            reduced = expr.reduce()
+            tree = dumps(reduced)
+            patterns = {}
+        patterns[style] = reduced.compile(style)
+        self._save(path, tree, patterns)
+        return reduced, patterns[style]
+
+    def clear(self):
+        for path, _, _ in list(self._iter_entries()):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self._size = 0
@@ -7,9 +7,11 @@
 # ----------
 
 import inspect
+from types import MappingProxyType
 from .common import CompileContext, CACHE
-from .expr_abs import ICharRangeRegexExpr, ISingledCharRegexExpr
+from .expr_abs import Range, ICharRangeRegexExpr, ISingledCharRegexExpr
 from .expr import RegexExpr, CharRangeRegexExpr
+from .automaton import MAX_CODE, Nfa
 
 class DigitCharRangeRegexExpr(CharRangeRegexExpr):
     def __init__(self):
@@ -27,7 +29,7 @@ class UpperCaseLetterCharRangeRegexExpr(CharRangeRegexExpr):
 
 
 class DotCharRangeRegexExpr(RegexExpr, ICharRangeRegexExpr, ISingledCharRegexExpr):
-    NOT_CHARS = [ord(ch) for ch in '\r\n']
+    NOT_CHARS = [ord('\n')]
 
     def __repr__(self):
         return 'Dot()'
@@ -36,7 +38,7 @@ class DotCharRangeRegexExpr(RegexExpr, ICharRangeRegexExpr, ISingledCharRegexExp
         context.buffer.write('.')
 
     def has(self, value):
-        return value not in '\r\n'
+        return value not in self.NOT_CHARS
 
     def get_order_code(self) -> int:
         return 0
@@ -47,6 +49,14 @@ class DotCharRangeRegexExpr(RegexExpr, ICharRangeRegexExpr, ISingledCharRegexExp
                 return False
         return True
 
+    def get_intervals(self) -> tuple:
+        return (Range(0, 9), Range(11, MAX_CODE))
+
+    def _build_nfa(self, nfa: Nfa, start: int) -> int:
+        end = nfa.add_state()
+        nfa.add_move(start, self.get_intervals(), end)
+        return end
+
 
 # register all class
 for cls in list(vars().values()):
@@ -61,3 +71,6 @@ for cls in list(vars().values()):
 
     if issubclass(cls, CharRangeRegexExpr) and cls is not CharRangeRegexExpr:
         CharRangeRegexExpr.RANGE_VALUE_MAP[ins._range] = ins
+
+# read only after import.
+CharRangeRegexExpr.RANGE_VALUE_MAP = MappingProxyType(CharRangeRegexExpr.RANGE_VALUE_MAP)
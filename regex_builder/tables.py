@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
+# ----------
+# precomputed unicode tables, stored compressed in `data/` and loaded lazily.
+# regenerate by `python -m regex_builder.tables`.
+# ----------
+
+import os
+import sys
+import zlib
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+
+from .common import get_or_create
+from .expr_abs import Range, merge_intervals
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+CASEFOLD_FILE = 'casefold.bin'
+UNICODE_FILE = 'unicode.bin'
+
+
+def _write_varint(buffer: bytearray, value: int):
+    while value > 0x7F:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _iter_varints(data: bytes):
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            yield value
+            value = shift = 0
+        else:
+            shift += 7
+
+
+def _dump(path: str, values):
+    ''' write `unidata_version` and varints, zlib compressed. '''
+    buffer = bytearray()
+    version = unicodedata.unidata_version.encode('ascii')
+    _write_varint(buffer, len(version))
+    buffer.extend(version)
+    for value in values:
+        _write_varint(buffer, value)
+    with open(path, 'wb') as fp:
+        fp.write(zlib.compress(bytes(buffer), 9))
+
+
+def _load(name: str):
+    ''' return (unidata_version, iterator of varints). '''
+    with open(os.path.join(DATA_DIR, name), 'rb') as fp:
+        data = zlib.decompress(fp.read())
+    values = _iter_varints(data)
+    size = next(values)
+    version = bytes(next(values) for _ in range(size)).decode('ascii')
+    return version, values
+
+
+# case fold
+
+def generate_casefold_classes() -> list:
+    '''
+    return the sorted classes of chars which are equal under simple case folding,
+    that is, chars connected by single char `lower()` or `upper()` mappings.
+    '''
+    parent = {}
+    def find(code):
+        while parent.get(code, code) != code:
+            code = parent[code]
+        return code
+    for code in range(sys.maxunicode + 1):
+        if 0xD800 <= code <= 0xDFFF:
+            continue
+        ch = chr(code)
+        for mapped in (ch.lower(), ch.upper()):
+            if len(mapped) == 1 and mapped != ch:
+                left, right = find(code), find(ord(mapped))
+                if left != right:
+                    parent[max(left, right)] = min(left, right)
+    classes = {}
+    for code in parent:
+        classes.setdefault(find(code), set()).add(code)
+    for root, members in classes.items():
+        members.add(root)
+    return sorted(tuple(sorted(members)) for members in classes.values())
+
+
+def _encode_classes(classes):
+    ''' class count, then each class: size, delta of first code from prev class, deltas in class. '''
+    yield len(classes)
+    prev = 0
+    for members in classes:
+        yield len(members)
+        yield members[0] - prev
+        prev = members[0]
+        for left, right in zip(members, members[1:]):
+            yield right - left
+
+
+class CaseFoldTable:
+    ''' lookup table for simple case folding. '''
+
+    def __init__(self, classes: list):
+        pairs = sorted((code, index) for index, members in enumerate(classes) for code in members)
+        self._classes = classes
+        self._codes = array('I', (code for code, _ in pairs))
+        self._indexes = array('I', (index for _, index in pairs))
+
+    @classmethod
+    def load(cls):
+        _, values = _load(CASEFOLD_FILE)
+        classes = []
+        prev = 0
+        for _ in range(next(values)):
+            size = next(values)
+            code = prev = prev + next(values)
+            members = [code]
+            for _ in range(size - 1):
+                code += next(values)
+                members.append(code)
+            classes.append(tuple(members))
+        return cls(classes)
+
+    def fold_intervals(self, intervals) -> tuple:
+        '''
+        return the merged Range tuples which contains the intervals and all case variants.
+        '''
+        ret = list(intervals)
+        codes = self._codes
+        for start, end in intervals:
+            for pos in range(bisect_left(codes, start), bisect_right(codes, end)):
+                for code in self._classes[self._indexes[pos]]:
+                    ret.append(Range(code, code))
+        return merge_intervals(ret)
+
+
+def get_casefold_table() -> CaseFoldTable:
+    return get_or_create((__name__, CASEFOLD_FILE), CaseFoldTable.load)
+
+
+# general categories and scripts
+
+# `unicodedata` has no script property, so a script is approximated by the first word of the char name,
+# only for letters, marks and numbers; for example `LATIN SMALL LETTER A` and `FULLWIDTH LATIN ...` are Latin.
+SCRIPT_WORDS = {
+    'LATIN': 'Latin', 'GREEK': 'Greek', 'CYRILLIC': 'Cyrillic', 'ARMENIAN': 'Armenian',
+    'HEBREW': 'Hebrew', 'ARABIC': 'Arabic', 'SYRIAC': 'Syriac', 'THAANA': 'Thaana',
+    'DEVANAGARI': 'Devanagari', 'BENGALI': 'Bengali', 'GURMUKHI': 'Gurmukhi', 'GUJARATI': 'Gujarati',
+    'ORIYA': 'Oriya', 'TAMIL': 'Tamil', 'TELUGU': 'Telugu', 'KANNADA': 'Kannada',
+    'MALAYALAM': 'Malayalam', 'SINHALA': 'Sinhala', 'THAI': 'Thai', 'LAO': 'Lao',
+    'TIBETAN': 'Tibetan', 'MYANMAR': 'Myanmar', 'GEORGIAN': 'Georgian', 'HANGUL': 'Hangul',
+    'ETHIOPIC': 'Ethiopic', 'CHEROKEE': 'Cherokee', 'KHMER': 'Khmer', 'MONGOLIAN': 'Mongolian',
+    'HIRAGANA': 'Hiragana', 'KATAKANA': 'Katakana', 'BOPOMOFO': 'Bopomofo', 'YI': 'Yi',
+}
+SCRIPT_HAN = 'Han' # `CJK UNIFIED IDEOGRAPH-XXXX` and `CJK COMPATIBILITY IDEOGRAPH-XXXX`.
+WIDTH_WORDS = ('FULLWIDTH', 'HALFWIDTH')
+
+
+def _get_script(code: int) -> str:
+    name = unicodedata.name(chr(code), '')
+    if name.startswith('CJK ') and 'IDEOGRAPH-' in name:
+        return SCRIPT_HAN
+    words = name.split(' ', 2)
+    if words[0] in WIDTH_WORDS:
+        words = words[1:]
+    return SCRIPT_WORDS.get(words[0]) if words else None
+
+
+def generate_unicode_tables() -> tuple:
+    '''
+    return (categories, scripts), each is a sorted list of (name, merged Range tuples).
+    categories are the two letters general categories, include `Cs` and `Cn`.
+    '''
+    categories = {}
+    scripts = {}
+    def append(table, name, code):
+        intervals = table.setdefault(name, [])
+        if intervals and intervals[-1][1] == code - 1:
+            intervals[-1][1] = code
+        else:
+            intervals.append([code, code])
+    for code in range(sys.maxunicode + 1):
+        category = unicodedata.category(chr(code))
+        append(categories, category, code)
+        if category[0] in 'LMN':
+            script = _get_script(code)
+            if script is not None:
+                append(scripts, script, code)
+    def freeze(table):
+        return sorted((name, tuple(Range(*r) for r in intervals)) for name, intervals in table.items())
+    return freeze(categories), freeze(scripts)
+
+
+def _encode_named_intervals(*tables):
+    '''
+    for each table: entry count, then each entry: name size, name, interval count,
+    then each interval: delta of start from prev end, size - 1.
+    '''
+    for table in tables:
+        yield len(table)
+        for name, intervals in table:
+            data = name.encode('ascii')
+            yield len(data)
+            yield from data
+            yield len(intervals)
+            prev = 0
+            for start, end in intervals:
+                yield start - prev
+                yield end - start
+                prev = end
+
+
+def _decode_named_intervals(values) -> dict:
+    table = {}
+    for _ in range(next(values)):
+        name = bytes(next(values) for _ in range(next(values))).decode('ascii')
+        intervals = []
+        prev = 0
+        for _ in range(next(values)):
+            start = prev + next(values)
+            prev = start + next(values)
+            intervals.append(Range(start, prev))
+        table[name] = tuple(intervals)
+    return table
+
+
+class UnicodeTable:
+    ''' intervals of the general categories and the scripts. '''
+
+    def __init__(self, version: str, categories: dict, scripts: dict):
+        self.version = version
+        self._categories = categories
+        self._scripts = scripts
+        # the major categories, for example `L` is `Ll | Lm | Lo | Lt | Lu`, and `LC` is the cased letters.
+        majors = {}
+        for name, intervals in categories.items():
+            majors.setdefault(name[0], []).extend(intervals)
+        for name, intervals in majors.items():
+            categories[name] = merge_intervals(intervals)
+        categories['LC'] = merge_intervals(categories.get('Ll', ()) + categories.get('Lt', ()) + categories.get('Lu', ()))
+
+    @classmethod
+    def load(cls):
+        version, values = _load(UNICODE_FILE)
+        categories = _decode_named_intervals(values)
+        scripts = _decode_named_intervals(values)
+        return cls(version, categories, scripts)
+
+    @property
+    def categories(self) -> tuple:
+        return tuple(sorted(self._categories))
+
+    @property
+    def scripts(self) -> tuple:
+        return tuple(sorted(self._scripts))
+
+    def get_category(self, name: str) -> tuple:
+        ''' return the Range tuples of a general category, like `L`, `Nd` or `LC`. '''
+        try:
+            return self._categories[name]
+        except KeyError:
+            raise ValueError('unknown unicode category: {!r}.'.format(name))
+
+    def get_script(self, name: str) -> tuple:
+        ''' return the Range tuples of a script, like `Latin` or `Han`. '''
+        try:
+            return self._scripts[name]
+        except KeyError:
+            raise ValueError('unknown unicode script: {!r}.'.format(name))
+
+
+def get_unicode_table() -> UnicodeTable:
+    return get_or_create((__name__, UNICODE_FILE), UnicodeTable.load)
+
+
+def generate():
+    ''' regenerate all data files from the running python's `unicodedata`. '''
+    os.makedirs(DATA_DIR, exist_ok=True)
+    _dump(os.path.join(DATA_DIR, CASEFOLD_FILE), _encode_classes(generate_casefold_classes()))
+    _dump(os.path.join(DATA_DIR, UNICODE_FILE), _encode_named_intervals(*generate_unicode_tables()))
+
+
+if __name__ == '__main__':
+    generate()
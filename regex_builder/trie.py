@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
+# ----------
+# a persistent radix trie of strings.
+#
+# nodes are immutable, insert and delete copy only the nodes on the path of the word,
+# so a old root is a snapshot and untouched nodes keep their rendered fragments.
+# ----------
+
+
+class Node:
+    __slots__ = ('terminal', 'edges', 'keys', 'size', 'fragments')
+
+    def __init__(self, terminal: bool, edges: tuple):
+        '''
+        `edges` is a tuple of (label, node) sorted by label,
+        labels are not empty and start with different chars.
+        '''
+        self.terminal = terminal
+        self.edges = edges
+        self.keys = ''.join(label[0] for label, _ in edges)
+        self.size = int(terminal) + sum(node.size for _, node in edges)
+        self.fragments = {} # dialect name -> rendered fragment, see `AlternationSet`.
+
+    def is_leaf(self) -> bool:
+        return self.terminal and not self.edges
+
+
+EMPTY = Node(False, ())
+LEAF = Node(True, ())
+
+
+def build(words) -> Node:
+    ''' build a trie from strings at once. '''
+    words = sorted(set(words))
+    return _build(words, 0, len(words), 0) if words else EMPTY
+
+def _build(words: list, lo: int, hi: int, depth: int) -> Node:
+    terminal = len(words[lo]) == depth
+    if terminal:
+        lo += 1
+    if lo == hi:
+        return LEAF
+    edges = []
+    while lo < hi:
+        ch = words[lo][depth]
+        end = lo + 1
+        while end < hi and words[end][depth] == ch:
+            end += 1
+        if end == lo + 1:
+            edges.append((words[lo][depth:], LEAF))
+        else:
+            # words are sorted, so the first and the last have the common prefix of all.
+            prefix = _common_prefix(words[lo], words[end - 1], depth + 1)
+            edges.append((words[lo][depth:prefix], _build(words, lo, end, prefix)))
+        lo = end
+    return Node(terminal, tuple(edges))
+
+
+def _common_prefix(left: str, right: str, start: int=0) -> int:
+    ''' return the length of the common prefix, the first `start` chars are known equal. '''
+    size = min(len(left), len(right))
+    while start < size and left[start] == right[start]:
+        start += 1
+    return start
+
+
+def contains(node: Node, word: str) -> bool:
+    while word:
+        index = node.keys.find(word[0])
+        if index < 0:
+            return False
+        label, node = node.edges[index]
+        if not word.startswith(label):
+            return False
+        word = word[len(label):]
+    return node.terminal
+
+
+def _replace(edges: tuple, index: int, *items) -> tuple:
+    return edges[:index] + items + edges[index + 1:]
+
+
+def insert(node: Node, word: str) -> Node:
+    ''' return the new root which contains the word, or `node` if it already exists. '''
+    if not word:
+        return node if node.terminal else Node(True, node.edges)
+    index = node.keys.find(word[0])
+    if index < 0:
+        edges = tuple(sorted(node.edges + ((word, LEAF), )))
+        return Node(node.terminal, edges)
+    label, child = node.edges[index]
+    prefix = _common_prefix(label, word)
+    if prefix == len(label):
+        new_child = insert(child, word[prefix:])
+        if new_child is child:
+            return node
+        return Node(node.terminal, _replace(node.edges, index, (label, new_child)))
+    # split the edge.
+    rest = word[prefix:]
+    edges = [(label[prefix:], child)]
+    if rest:
+        edges.append((rest, LEAF))
+    middle = Node(not rest, tuple(sorted(edges)))
+    return Node(node.terminal, _replace(node.edges, index, (label[:prefix], middle)))
+
+
+def delete(node: Node, word: str) -> Node:
+    ''' return the new root which does not contain the word, or `node` if it does not exist. '''
+    if not word:
+        return Node(False, node.edges) if node.terminal else node
+    index = node.keys.find(word[0])
+    if index < 0:
+        return node
+    label, child = node.edges[index]
+    if not word.startswith(label):
+        return node
+    new_child = delete(child, word[len(label):])
+    if new_child is child:
+        return node
+    if not new_child.size:
+        return Node(node.terminal, _replace(node.edges, index))
+    if not new_child.terminal and len(new_child.edges) == 1:
+        # merge the edges, keep the trie compressed.
+        sub_label, sub_child = new_child.edges[0]
+        return Node(node.terminal, _replace(node.edges, index, (label + sub_label, sub_child)))
+    return Node(node.terminal, _replace(node.edges, index, (label, new_child)))
+
+
+def iter_words(node: Node, prefix: str=''):
+    ''' iterate the words in sorted order. '''
+    if node.terminal:
+        yield prefix
+    for label, child in node.edges:
+        yield from iter_words(child, prefix + label)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017~2999 - cologler <skyoflw@gmail.com>
+# ----------
+# vectorized fullmatch for fixed length char class patterns, requires numpy.
+# ----------
+
+from itertools import product
+
+from .expr_abs import Range, ICharRangeRegexExpr
+from .expr import (
+    RegexExpr,
+    StringRegexExpr,
+    AndRegexExpr,
+    OrRegexExpr,
+    CharsOrRegexExpr,
+    GroupedRegexExpr,
+    RepeatedRegexExpr,
+    AutoGroupedRegexExpr,
+    EMPTY,
+)
+
+MAX_BRANCHES = 256
+TABLE_SIZE = 0x10000
+
+
+def get_branches(expr: RegexExpr) -> list:
+    '''
+    return the expr as a union of fixed length branches,
+    each branch is a tuple of the char intervals for each position.
+
+    raise ValueError if the expr is not composed of char classes.
+    '''
+    if expr is EMPTY:
+        return [()]
+    if isinstance(expr, (CharsOrRegexExpr, ICharRangeRegexExpr)):
+        return [(expr.get_intervals(), )]
+    if isinstance(expr, StringRegexExpr):
+        return [tuple((Range(ord(ch), ord(ch)), ) for ch in expr.value)]
+    if isinstance(expr, AndRegexExpr):
+        return _product([get_branches(e) for e in expr.exprs])
+    if isinstance(expr, OrRegexExpr):
+        branches = []
+        for e in expr.exprs:
+            if e._has_content():
+                branches.extend(get_branches(e))
+        return _check_size(branches or [()])
+    if isinstance(expr, (GroupedRegexExpr, AutoGroupedRegexExpr)):
+        return get_branches(expr._expr)
+    if isinstance(expr, RepeatedRegexExpr) and expr._max is not None:
+        body = get_branches(expr._expr)
+        branches = []
+        for count in range(expr._min or 0, expr._max + 1):
+            branches.extend(_product([body] * count))
+        return _check_size(branches)
+    raise ValueError('{!r} is not a fixed length char class expr.'.format(expr))
+
+
+def _product(parts: list) -> list:
+    size = 1
+    for part in parts:
+        size *= len(part)
+    _check_size(range(size))
+    return [sum(items, ()) for items in product(*parts)]
+
+
+def _check_size(branches):
+    if len(branches) > MAX_BRANCHES:
+        raise ValueError('too many branches ({} > {}).'.format(len(branches), MAX_BRANCHES))
+    return branches
+
+
+class _PositionTable:
+    ''' vectorized membership test of code points for one position. '''
+
+    def __init__(self, numpy, intervals):
+        self._numpy = numpy
+        self._starts = numpy.array([start for start, _ in intervals], dtype=numpy.uint32)
+        self._ends = numpy.array([end for _, end in intervals], dtype=numpy.uint32)
+        self._table = None
+        if intervals and intervals[-1].end < TABLE_SIZE:
+            # the last slot is always False for all codes out of table.
+            self._table = numpy.zeros(intervals[-1].end + 2, dtype=bool)
+            for start, end in intervals:
+                self._table[start:end + 1] = True
+
+    def match(self, codes):
+        numpy = self._numpy
+        if self._table is not None:
+            return self._table[numpy.minimum(codes, len(self._table) - 1)]
+        if not len(self._starts):
+            return numpy.zeros(codes.shape, dtype=bool)
+        index = numpy.searchsorted(self._starts, codes, side='right') - 1
+        return (index >= 0) & (codes <= self._ends[numpy.maximum(index, 0)])
+
+
+class VectorMatcher:
+    '''
+    fullmatch a whole array of strings at once:
+
+    * a numpy str array (dtype `<Un`), return a bool mask with same shape;
+    * a 2D code point array, each row is a string, return a 1D bool mask.
+    '''
+
+    def __init__(self, branches: list):
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError('VectorMatcher requires numpy.')
+        self._numpy = numpy
+        self._branches = [
+            tuple(_PositionTable(numpy, intervals) for intervals in branch) for branch in branches
+        ]
+
+    @classmethod
+    def from_expr(cls, expr: RegexExpr):
+        return cls(get_branches(expr))
+
+    def __call__(self, values, lengths=None):
+        '''
+        `lengths` is the length of each row for 2D code point array,
+        default is the width of the array.
+        '''
+        numpy = self._numpy
+        values = numpy.asarray(values)
+        shape = None
+        if values.dtype.kind == 'U':
+            shape = values.shape
+            width = values.dtype.itemsize // 4
+            lengths = numpy.char.str_len(values).reshape(-1)
+            values = numpy.ascontiguousarray(values).reshape(-1)
+            codes = values.view(numpy.uint32).reshape(len(values), width)
+        elif values.ndim == 2 and values.dtype.kind in 'iu':
+            width = values.shape[1]
+            codes = values.astype(numpy.uint32, copy=False)
+            if lengths is None:
+                lengths = numpy.full(len(codes), width)
+        else:
+            raise TypeError('values must be a str array or a 2D code point array.')
+
+        ret = numpy.zeros(len(codes), dtype=bool)
+        for branch in self._branches:
+            if len(branch) > width:
+                continue
+            mask = lengths == len(branch)
+            for position, table in enumerate(branch):
+                mask &= table.match(codes[:, position])
+            ret |= mask
+        return ret if shape is None else ret.reshape(shape)
@@ -7,10 +7,183 @@
 # ----------
 
 import os
+import re
+import json
+import math
 import sys
+import tempfile
 import traceback
 from regex_builder import RegexBuilder
+from regex_builder.common import RegexStyle, CompileContext
+from regex_builder.dialect import UnsupportedSyntaxError
+from regex_builder.expr import LookaroundRegexExpr
+from regex_builder.__main__ import main as cli_main
+from regex_builder import library
+from regex_builder.cost import CostModel, calibrate, get_cost_model
+from regex_builder.profile import Profile
+from regex_builder.serialize import BuildCache, dumps, loads, structural_hash
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class Re2Validator:
+    '''
+    a offline check of the RE2 syntax (https://github.com/google/re2/wiki/Syntax),
+    raise ValueError at the first construct which RE2 rejects.
+    '''
+
+    MAX_REPEAT = 1000
+    REPEAT = re.compile(r'\{(\d+)(,(\d*))?\}')
+    FLAGS = re.compile(r'\?[imsU]*(-[imsU]+)?[:)]')
+
+    def __init__(self, pattern: str):
+        self._pattern = pattern
+        self._pos = 0
+
+    def _error(self, message):
+        raise ValueError('{} at {} in {!r}'.format(message, self._pos, self._pattern))
+
+    def _peek(self):
+        return self._pattern[self._pos] if self._pos < len(self._pattern) else None
+
+    def validate(self):
+        self._alternation()
+        if self._pos != len(self._pattern):
+            self._error('unexpected )')
+
+    # each parse method returns the max product of the nested counted repeats,
+    # RE2 rejects a product over `MAX_REPEAT`.
+
+    def _alternation(self) -> int:
+        product = self._concat()
+        while self._peek() == '|':
+            self._pos += 1
+            product = max(product, self._concat())
+        return product
+
+    def _concat(self) -> int:
+        product = 1
+        while self._peek() not in (None, '|', ')'):
+            inner = self._atom()
+            count = self._quantifier()
+            if count is not None:
+                if self._peek() == '?': # non-greedy
+                    self._pos += 1
+                if self._quantifier() is not None:
+                    self._error('bad repetition operator')
+                inner *= count
+                if inner > self.MAX_REPEAT:
+                    self._error('bad repetition operator')
+            product = max(product, inner)
+        return product
+
+    def _quantifier(self) -> int:
+        ''' return the count of a counted repeat, 1 for `*`, `+` and `?`, or `None`. '''
+        ch = self._peek()
+        if ch in ('*', '+', '?'):
+            self._pos += 1
+            return 1
+        if ch == '{':
+            match = self.REPEAT.match(self._pattern, self._pos)
+            if match:
+                min = int(match.group(1))
+                max = int(match.group(3)) if match.group(3) else min
+                if max > self.MAX_REPEAT or min > max:
+                    self._error('bad repetition operator')
+                self._pos = match.end()
+                return max # `{n,}` counts n.
+        return None
+
+    def _atom(self) -> int:
+        ch = self._peek()
+        if ch == '(':
+            self._pos += 1
+            if self._peek() == '?':
+                name = re.compile(r'\?P<[A-Za-z0-9_]+>').match(self._pattern, self._pos)
+                flags = self.FLAGS.match(self._pattern, self._pos)
+                if self._pattern.startswith('?:', self._pos) or name:
+                    self._pos = name.end() if name else self._pos + 2
+                elif flags:
+                    self._pos = flags.end()
+                    if self._pattern[self._pos - 1] == ')':
+                        return 1
+                else:
+                    self._error('invalid or unsupported group')
+            product = self._alternation()
+            if self._peek() != ')':
+                self._error('missing )')
+            self._pos += 1
+            return product
+        elif ch == '[':
+            self._class()
+        elif ch == '\\':
+            self._escape(False)
+        elif ch in ('*', '+', '?') or (ch == '{' and self.REPEAT.match(self._pattern, self._pos)):
+            self._error('missing argument to repetition operator')
+        else:
+            self._pos += 1
+        return 1
+
+    def _escape(self, in_class: bool):
+        ''' return the code of the escaped char, or `None` if it is not a single char. '''
+        self._pos += 1
+        ch = self._peek()
+        if ch is None:
+            self._error('trailing \\')
+        self._pos += 1
+        if ch in 'dDsSwW' or (not in_class and ch in 'AbBz'):
+            return None
+        if ch in 'pP':
+            match = re.compile(r'[A-Z]|\{\^?[A-Za-z_]+\}').match(self._pattern, self._pos)
+            if not match:
+                self._error('invalid character class')
+            self._pos = match.end()
+            return None
+        if ch == 'x':
+            match = re.compile(r'\{([0-9A-Fa-f]{1,6})\}|[0-9A-Fa-f]{2}').match(self._pattern, self._pos)
+            if not match:
+                self._error('invalid escape sequence')
+            self._pos = match.end()
+            code = int(match.group(1) or match.group(0), 16)
+            if code > 0x10FFFF or 0xD800 <= code <= 0xDFFF:
+                self._error('invalid escape sequence')
+            return code
+        if ch in 'afnrtv':
+            return ord('\a\f\n\r\t\v'['afnrtv'.index(ch)])
+        if ord(ch) < 0x80 and not ch.isalnum() and ch != '_':
+            return ord(ch)
+        self._error('invalid escape sequence \\' + ch)
+
+    def _class_char(self):
+        if self._peek() == '\\':
+            return self._escape(True)
+        ch = self._peek()
+        self._pos += 1
+        return ord(ch)
+
+    def _class(self):
+        self._pos += 1
+        if self._peek() == '^':
+            self._pos += 1
+        first = True
+        while True:
+            ch = self._peek()
+            if ch is None:
+                self._error('missing ]')
+            if ch == ']' and not first:
+                self._pos += 1
+                return
+            first = False
+            start = self._class_char()
+            if self._peek() == '-' and self._pattern[self._pos + 1:self._pos + 2] not in ('', ']'):
+                self._pos += 1
+                end = self._class_char()
+                if start is None or end is None or end < start:
+                    self._error('bad character class range')
 
 
 class Test(unittest.TestCase):
@@ -51,6 +224,14 @@ class Test(unittest.TestCase):
         expr |= builder.dot()
         self.assertEqual(expr.reduce().compile(), '.')
 
+        # `.` matches everything but `\n`, like `re`.
+        dot = builder.dot()
+        self.assertEqual(dot.count(), sum(1 for ch in map(chr, range(0x110000)) if re.fullmatch('.', ch)))
+        predicate = dot.to_predicate()
+        for ch in '\n\r\x0b\x0c':
+            self.assertEqual(bool(predicate(ch)), re.fullmatch('.', ch) is not None)
+        self.assertEqual((dot | builder.char('\r')).reduce().compile(), '.')
+
     def test_int_range(self):
         builder = RegexBuilder()
         expr = builder.int_range(0, 255).reduce()
@@ -78,6 +259,34 @@ class Test(unittest.TestCase):
             '56[0-7]'
         ]))
 
+    def test_int_range_extraction(self):
+        builder = RegexBuilder()
+        for min_value, max_value in [(0, 4), (11, 16), (210, 219), (199, 200), (1000, 1099), (7, 1234)]:
+            for longest_first in (False, True):
+                expr = builder.int_range(min_value, max_value, longest_first=longest_first).reduce()
+                pattern = re.compile(expr.compile())
+                matched = [i for i in range(2000) if pattern.fullmatch(str(i))]
+                self.assertEqual(matched, list(range(min_value, max_value + 1)))
+        self.assertEqual(builder.int_range(0, 255, longest_first=True).reduce().compile(), '|'.join(
+            reversed(self.RANGE_VALUES[(0, 255)].split('|'))))
+
+        expr = builder.int_range(0, 255, longest_first=True, boundary=True).reduce()
+        self.assertEqual(re.findall(expr.compile(), '255 2555 007 25,256 0'), ['255', '25', '0'])
+        self.assertEqual(expr.count(), 256)
+        self.assertEqual(loads(dumps(expr)).compile(), expr.compile())
+        self.assertRaises(UnsupportedSyntaxError, expr.compile, RegexStyle.re2)
+        # the lookbehind inspects the digits before it, so the repeat is not possessive.
+        self.assertTrue((builder.digit().repeat(0) & expr).reduce().compile(atomic=True).startswith('[0-9]*('))
+
+        # the body of a lookaround is analyzed against its own end.
+        expr = LookaroundRegexExpr(builder.digit().repeat(0) & builder.char('5')) & builder.digit().repeat(1)
+        self.assertTrue(re.fullmatch(expr.reduce().compile(atomic=True), '125'))
+
+        expr = builder.int_range(0, 255, boundary=builder.digit() | builder.char('.'), leading_zeros=True)
+        self.assertEqual(re.findall(expr.reduce().compile(), '007 1.5 300'), ['007'])
+        self.assertFalse(expr.to_predicate()('1.5'))
+        self.assertRaises(TypeError, builder.int_range, 0, 9, boundary=builder.string('ab'))
+
     def test_ipv4(self):
         builder = RegexBuilder()
         expr = builder.int_range(0, 255)
@@ -126,6 +335,449 @@ class Test(unittest.TestCase):
         expr = expr.repeat(0)
         self.assertEqual(expr.reduce().compile(), '(?:{})*'.format(self.RANGE_VALUES[(0, 255)]))
 
+    def test_count(self):
+        builder = RegexBuilder()
+        self.assertEqual(builder.int_range(0, 255).count(), 256)
+        self.assertEqual(builder.int_range(13, 2 ** 63).reduce().count(), 2 ** 63 - 12)
+        # ambiguous exprs count each string once.
+        expr = (builder.char('a') | builder.string('ab')) & (builder.char('b') | builder.string(''))
+        self.assertEqual(expr.count(), 3)
+        self.assertEqual(builder.digit().repeat(0).count(), float('inf'))
+
+    def test_enumerate(self):
+        builder = RegexBuilder()
+        expr = builder.int_range(0, 255).reduce()
+        self.assertListEqual(list(expr.enumerate()), [str(i) for i in range(256)])
+        expr = builder.char_range('a', 'b').repeat(0)
+        items = [s for s, _ in zip(expr.enumerate(), range(7))]
+        self.assertListEqual(items, ['', 'a', 'b', 'aa', 'ab', 'ba', 'bb'])
+
+    def test_sample(self):
+        builder = RegexBuilder()
+        expr = builder.int_range(0, 2 ** 63).reduce()
+        items = expr.sample(1000, seed=1)
+        self.assertEqual(len(items), 1000)
+        self.assertListEqual(items, expr.sample(1000, seed=1))
+        pattern = re.compile(expr.compile())
+        for item in items:
+            self.assertTrue(pattern.fullmatch(item))
+            self.assertTrue(0 <= int(item) <= 2 ** 63)
+        with self.assertRaises(ValueError):
+            builder.digit().repeat(0).sample(1)
+
+    @unittest.skipIf(sys.version_info < (3, 11), 'atomic groups require python 3.11+')
+    def test_atomic(self):
+        builder = RegexBuilder()
+        expr = builder.digit().repeat(1) & builder.char('.') & builder.lower_case_letter().repeat(0) & builder.char('a')
+        self.assertEqual(expr.reduce().compile(atomic=True), '[0-9]++\\.[a-z]*a')
+        expr = builder.string('ab').repeat(0) & builder.char('c')
+        self.assertEqual(expr.reduce().compile(atomic=True), '(?>ab)*+c')
+        # python raises `SystemError` on a possessive quantifier over a capture group.
+        for max in (None, 5):
+            expr = (builder.char('A').group() | builder.digit()).repeat(0, max).reduce()
+            pattern = expr.compile(atomic=True)
+            if sys.version_info >= (3, 11):
+                self.assertFalse(pattern.endswith('+'))
+            self.assertEqual(re.match(pattern, 'A11').group(), 'A11')
+        expr = builder.digit().repeat(2, 5) & builder.digit()
+        self.assertEqual(expr.reduce().compile(atomic=True), '[0-9]{2,5}[0-9]')
+        # int_range is not prefix-free, so the group must keep backtracking.
+        expr = builder.int_range(0, 255) & builder.char('.')
+        self.assertEqual(expr.reduce().compile(atomic=True), expr.reduce().compile())
+
+        expr = (builder.lower_case_letter().repeat(1) & builder.char('-')).repeat(1) & builder.digit().repeat(0)
+        expr = expr.reduce()
+        normal = re.compile(expr.compile())
+        atomic = re.compile(expr.compile(atomic=True))
+        for text in ['ab-', 'ab-c-12', 'ab-c', 'a-b-1a', '-', 'a--1', 'ab-1-']:
+            self.assertEqual(bool(normal.fullmatch(text)), bool(atomic.fullmatch(text)))
+            self.assertEqual(normal.match(text) and normal.match(text).end(),
+                             atomic.match(text) and atomic.match(text).end())
+
+    def test_cost_model(self):
+        builder = RegexBuilder()
+        model = get_cost_model(RegexStyle.python)
+        self.assertEqual(builder.int_range(0, 255).reduce().compile(cost_model=model), self.RANGE_VALUES[(0, 255)])
+        self.assertEqual(builder.string('ab').repeat(3, 3).reduce().compile(cost_model=model), 'ababab')
+        self.assertEqual(builder.digit().repeat(8, 8).reduce().compile(cost_model=model), '[0-9]{8}')
+        expr = builder.char_range('1', '9')
+        for _ in range(4):
+            expr &= builder.digit()
+        self.assertEqual(expr.reduce().compile(cost_model=model), '[1-9][0-9]{4}')
+        # shorthands only under ascii.
+        model = CostModel(shorthand=1)
+        self.assertEqual(builder.digit().reduce().compile(cost_model=model), '[0-9]')
+        self.assertEqual(builder.digit().reduce().compile(cost_model=model, ascii=True), '\\d')
+        # `\s` of RE2 does not include `\v`.
+        space = (builder.char_range(0x09, 0x0D) | builder.char(' ')).reduce()
+        self.assertEqual(space.compile(cost_model=model, ascii=True), '\\s')
+        self.assertEqual(space.compile(RegexStyle.re2, cost_model=model, ascii=True), '[\\x{9}-\\x{D} ]')
+        space = (builder.char_range(0x09, 0x0A) | builder.char_range(0x0C, 0x0D) | builder.char(' ')).reduce()
+        self.assertEqual(space.compile(RegexStyle.re2, cost_model=model, ascii=True), '\\s')
+        # alternation if a branch is cheaper than a class.
+        model = CostModel(branch=0, char_class=10)
+        expr = builder.char('a') | builder.char('.')
+        self.assertEqual(expr.reduce().compile(cost_model=model), '(?:\\.|a)')
+
+    def test_calibrate(self):
+        model = calibrate(size=16, number=10)
+        self.assertIsInstance(model, CostModel)
+        for name in CostModel.WEIGHTS:
+            self.assertGreaterEqual(getattr(model, name), 0)
+
+    @unittest.skipIf(numpy is None, 'requires numpy')
+    def test_vector_matcher(self):
+        builder = RegexBuilder()
+        hex_char = builder.digit() | builder.char_range('a', 'f')
+        matcher = hex_char.repeat(8, 8).reduce().vector_matcher()
+        values = numpy.array(['deadbeef', 'DEADBEEF', '0123456', '01234567x', '0123abcd', ''])
+        self.assertListEqual(matcher(values).tolist(), [True, False, False, False, True, False])
+
+        expr = builder.int_range(100, 999).reduce()
+        matcher = expr.vector_matcher()
+        values = numpy.array([str(i) for i in range(2000)])
+        pattern = re.compile(expr.compile())
+        self.assertListEqual(matcher(values).tolist(), [bool(pattern.fullmatch(v)) for v in values])
+        codes = numpy.array([[ord(c) for c in '123'], [ord(c) for c in '099']])
+        self.assertListEqual(matcher(codes).tolist(), [True, False])
+
+        with self.assertRaises(ValueError):
+            builder.digit().repeat(0).vector_matcher()
+
+    def test_profile(self):
+        builder = RegexBuilder()
+        methods = builder.string('GET') | builder.string('POST') | builder.string('PUT')
+        expr = (methods & builder.char(' ') & builder.int_range(0, 255)).reduce()
+        profiler = expr.instrument()
+        self.assertTrue(profiler.pattern.startswith('(?:(?P<_a0_0>GET)|(?P<_a0_1>POST)|(?P<_a0_2>PUT))'))
+        profiler.feed(['PUT 1', 'PUT 22', 'POST 3', 'GET 4 PUT 5'])
+        self.assertListEqual(profiler.profile.alternations[0]['hits'], [1, 1, 3])
+        self.assertListEqual(profiler.profile.alternations[0]['inferred_attempts'], [5, 4, 3])
+        # failed scans are not recorded.
+        profiler.feed(['DELETE 1', 'nothing'])
+        self.assertListEqual(profiler.profile.alternations[0]['inferred_attempts'], [5, 4, 3])
+        # a alternation in a repeat records one hit per match.
+        repeated = (methods & builder.char(' ')).repeat(1).reduce().instrument()
+        repeated.feed(['PUT POST PUT '], 'fullmatch')
+        self.assertListEqual(repeated.profile.alternations[0]['hits'], [0, 1, 0])
+        # int_range alternatives are not mutually exclusive.
+        self.assertEqual(profiler.reorder().compile(),
+                         '(?:PUT|GET|POST) (?:{})'.format(self.RANGE_VALUES[(0, 255)]))
+
+        # the alternations of the members of a AlternationSet, in any insertion order.
+        counted = (builder.char('x') | builder.string('yy') | builder.string('zzz')) & builder.digit()
+        for members in ([methods, counted], [counted, methods]):
+            items = builder.alternation_set(members).instrument()
+            items.feed(['POST zzz1 POST'])
+            self.assertEqual(items.reorder().compile(), '(?:zzz|x|yy)[0-9]|POST|GET|PUT')
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'profile.json')
+            profiler.profile.save(path)
+            profile = Profile.load(path)
+        self.assertEqual(profile.apply(expr).compile(), profiler.reorder().compile())
+        with self.assertRaises(ValueError):
+            profile.apply(builder.digit())
+
+    def test_serialize(self):
+        builder = RegexBuilder()
+        octet = builder.int_range(0, 255)
+        expr = octet & builder.char('.') & octet & builder.char('.') & octet & builder.char('.') & octet
+        for e in (expr, expr.reduce(), builder.dot().repeat(1, 3).group(False), builder.string('\u4e2d\U0001F600')):
+            self.assertEqual(loads(dumps(e)).compile(), e.compile())
+        # shared subtrees are written once.
+        self.assertLess(len(dumps(expr)), len(dumps(octet)) * 2)
+        other = builder.int_range(0, 255) & builder.char('.') & octet & builder.char('.') & octet & builder.char('.') & octet
+        self.assertEqual(structural_hash(expr), structural_hash(other))
+        self.assertNotEqual(structural_hash(expr), structural_hash(octet))
+        with self.assertRaises(ValueError):
+            loads(b'RXB\xff')
+
+    def test_build_cache(self):
+        builder = RegexBuilder()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = BuildCache(tmpdir, max_size=1024)
+            expr = builder.int_range(0, 255)
+            reduced, pattern = cache.build(expr)
+            self.assertEqual(pattern, self.RANGE_VALUES[(0, 255)])
+            reduced, pattern = BuildCache(tmpdir).build(builder.int_range(0, 255))
+            self.assertEqual(pattern, self.RANGE_VALUES[(0, 255)])
+            self.assertEqual(reduced.compile(), pattern)
+            for i in range(50):
+                cache.build(builder.int_range(i, 1000 + i))
+            self.assertLessEqual(sum(os.path.getsize(os.path.join(tmpdir, name)) for name in os.listdir(tmpdir)), 1024)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            # adding a style replaces the entry, the size is not counted twice.
+            cache = BuildCache(tmpdir)
+            expr = builder.unicode_category('Zs') & builder.char('.')
+            for style in (RegexStyle.python, RegexStyle.csharp, RegexStyle.re2, RegexStyle.python):
+                cache.build(expr, style)
+            self.assertEqual(cache._size, sum(os.path.getsize(os.path.join(tmpdir, name)) for name in os.listdir(tmpdir)))
+            # a broken file is a cache miss.
+            path, = [os.path.join(tmpdir, name) for name in os.listdir(tmpdir)]
+            with open(path, 'rb') as fp:
+                data = fp.read()
+            for index in range(len(data)):
+                for value in (0, 1, 0xFF):
+                    with open(path, 'wb') as fp:
+                        fp.write(data[:index] + bytes([value]) + data[index + 1:])
+                    self.assertEqual(cache.build(expr)[1], expr.reduce().compile())
+            # a entry with a valid crc but a invalid tree, a empty char set.
+            cache._save(path, b'RXB' + bytes([1, 13, 0]), {})
+            self.assertEqual(cache.build(expr)[1], expr.reduce().compile())
+
+    def test_threads(self):
+        builder = RegexBuilder()
+        ranges = [(i, i * 37 + 1000) for i in range(64)]
+        def build(bounds):
+            expr = builder.int_range(*bounds).reduce()
+            return expr.compile(), expr.count(), expr.compile(atomic=True)
+        shared = builder.int_range(0, 2 ** 32).reduce()
+        def sample(seed):
+            return shared.sample(100, seed=seed), list(zip(shared.enumerate(), range(100)))
+
+        expected = [build(bounds) for bounds in ranges]
+        expected_samples = [sample(seed) for seed in range(16)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            self.assertListEqual(list(executor.map(build, ranges)), expected)
+            self.assertListEqual(list(executor.map(sample, range(16))), expected_samples)
+
+    def test_ignore_case(self):
+        builder = RegexBuilder()
+        expr = builder.string('Get-1') & builder.lower_case_letter().repeat(1)
+        expr = expr.ignore_case().reduce()
+        self.assertEqual(expr.compile(), '[Gg][Ee][Tt]\\-1[A-Za-z\u0131\u017f\u212a]+')
+        pattern = re.compile(expr.compile())
+        ignore_case = re.compile('Get\\-1[a-z]+', re.IGNORECASE)
+        for text in ['get-1x', 'GET-1ABC', 'gEt-1', 'get_1a', 'Get-1\u212a', 'GET-2a']:
+            self.assertEqual(bool(pattern.fullmatch(text)), bool(ignore_case.fullmatch(text)))
+        # only the rewritten part ignores case.
+        expr = builder.char('a').ignore_case() & builder.char('b')
+        self.assertEqual(expr.reduce().compile(), '[Aa]b')
+        self.assertIs(builder.digit().ignore_case(), builder.digit())
+
+    def test_dialect(self):
+        builder = RegexBuilder()
+        expr = builder.char_range('/u2E80', '/u9FFF').reduce()
+        self.assertEqual(expr.compile(RegexStyle.re2), '[\\x{2E80}-\\x{9FFF}]')
+        self.assertEqual(expr.compile(RegexStyle.csharp), '[\\u2E80-\\u9FFF]')
+        expr = builder.char_range(0x80, 0x1F600).reduce()
+        self.assertEqual(expr.compile(), '[\\u0080-\\U0001F600]')
+        self.assertEqual(expr.compile(RegexStyle.re2), '[\\x{80}-\\x{1F600}]')
+        with self.assertRaises(UnsupportedSyntaxError):
+            expr.compile(RegexStyle.csharp)
+        self.assertEqual(builder.string('\U0001F600').compile(RegexStyle.csharp), '\\uD83D\\uDE00')
+
+        expr = builder.string('a|b$') & builder.char('|')
+        self.assertEqual(expr.reduce().compile(), 'a\\|b\\$\\|')
+        self.assertTrue(re.fullmatch(expr.reduce().compile(), 'a|b$|'))
+
+        expr = builder.digit().repeat(2, 1000).reduce()
+        Re2Validator(expr.compile(RegexStyle.re2)).validate()
+        with self.assertRaises(UnsupportedSyntaxError):
+            builder.digit().repeat(1001).reduce().compile(RegexStyle.re2)
+        self.assertEqual(builder.digit().repeat(1001).reduce().compile(), '[0-9]{1001,}')
+        # RE2 also limits the product of nested counted repeats.
+        with self.assertRaises(UnsupportedSyntaxError):
+            builder.digit().repeat(2, 100).repeat(0, 20).reduce().compile(RegexStyle.re2)
+        expr = builder.digit().repeat(2, 10).repeat(0, 20).reduce()
+        self.assertEqual(expr.compile(RegexStyle.re2), '(?:[0-9]{2,10}){0,20}')
+        Re2Validator(expr.compile(RegexStyle.re2)).validate()
+        Re2Validator(builder.digit().repeat(1).repeat(0, 1000).reduce().compile(RegexStyle.re2)).validate()
+
+        # named groups of the instrumented alternations.
+        context = CompileContext(style=RegexStyle.csharp, alternations=[])
+        (builder.char('a') | builder.string('bc')).reduce()._compile(context)
+        self.assertEqual(context.buffer.getvalue(), '(?<_a0_0>a)|(?<_a0_1>bc)')
+
+        # re2 output is always accepted by RE2.
+        exprs = [
+            builder.int_range(0, 255).group() & builder.char('.') & builder.int_range(1, 65535),
+            builder.string('a(b)[c]{d}^$.*+?|\\-') | builder.char(' ').repeat(1),
+            (builder.string('ab').repeat(0) & builder.char('c')).group(False),
+            builder.digit().repeat(1) & builder.char('.') & builder.lower_case_letter().repeat(0, 3),
+            builder.string('Get-1').ignore_case() | builder.dot().repeat(0),
+            builder.char_range(0, 0x10FFFF) & builder.char_range(0xE000, 0xFFFF),
+        ]
+        for expr in exprs:
+            expr = expr.reduce()
+            for kwargs in [{}, dict(atomic=True), dict(cost_model=get_cost_model(RegexStyle.re2), ascii=True)]:
+                pattern = expr.compile(RegexStyle.re2, **kwargs)
+                Re2Validator(pattern).validate()
+                re.compile(expr.compile(**kwargs))
+        for pattern in ['(?>a)', 'a++', '\\u0041', '(?=a)', '(?<!a)b', '(a)\\1', '[b-a]', 'a{1001}', '(a',
+                        '(?:a{2,100}){0,20}', '((?:a{10}b)*){101}']:
+            with self.assertRaises(ValueError):
+                Re2Validator(pattern).validate()
+
+    def test_cli(self):
+        rules = [
+            {'id': 'byte', 'expr': {'int_range': [0, 255]}},
+            {'id': 'method', 'expr': {'and': [{'words': ['GET', 'POST']}, {'char': ' '}]}},
+            {'id': 'hex', 'expr': {'repeat': {'or': [{'spec': 'digit'}, {'char_range': ['a', 'f']}]}, 'min': 1}},
+            {'id': 'bad', 'expr': {'unknown': 1}},
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'rules.jsonl')
+            with open(source, 'w') as fp:
+                fp.write('\n'.join(json.dumps(rule) for rule in rules * 3))
+            for workers in ('1', '2'):
+                output = os.path.join(directory, 'out{}.jsonl'.format(workers))
+                code = cli_main([source, '-o', output, '-j', workers, '--cache', os.path.join(directory, 'cache')])
+                self.assertEqual(code, 1)
+                with open(output) as fp:
+                    results = [json.loads(line) for line in fp]
+                self.assertListEqual([r['id'] for r in results], [r['id'] for r in rules] * 3)
+                self.assertEqual(results[0]['pattern'], self.RANGE_VALUES[(0, 255)])
+                self.assertEqual(results[1]['pattern'], '(?:GET|POST) ')
+                self.assertEqual(results[2]['pattern'], '[0-9a-f]+')
+                self.assertIn('error', results[3])
+
+    def test_library(self):
+        builder = RegexBuilder()
+        self.assertIs(library.ipv4_octet(), library.ipv4_octet())
+        self.assertListEqual(sorted(int(x) for x in library.ipv4_octet().enumerate()), list(range(256)))
+        self.assertListEqual(sorted(int(x) for x in library.port().enumerate()), list(range(65536)))
+        self.assertEqual(library.http_status().count(), 500)
+        expr = (library.ipv4() & builder.char(':') & library.port()).reduce()
+        fullmatch = re.compile(expr.compile()).fullmatch
+        for text, matched in [('10.0.0.1:8080', True), ('255.255.255.255:65535', True),
+                              ('256.0.0.1:80', False), ('1.2.3.4:65536', False), ('01.2.3.4:80', False)]:
+            self.assertEqual(bool(fullmatch(text)), matched, text)
+        fullmatch = re.compile(library.iso8601().compile()).fullmatch
+        for text, matched in [('2024-02-29T23:59:59Z', True), ('2024-12-01T00:00:00.123+08:00', True),
+                              ('2024-13-01T00:00:00Z', False), ('2024-01-01T24:00:00Z', False)]:
+            self.assertEqual(bool(fullmatch(text)), matched, text)
+        self.assertTrue(re.fullmatch(library.uuid().compile(), '123e4567-E89b-12d3-a456-426614174000'))
+        for get in library.FIELDS.values():
+            Re2Validator(get().compile(RegexStyle.re2)).validate()
+
+    def test_alternation_set(self):
+        builder = RegexBuilder()
+        items = builder.alternation_set(['cat', 'car', 'cart', 'dog', 'a', 'b', 'do'])
+        self.assertEqual(items.compile(), '[ab]|ca(?:t|rt?)|dog?')
+        snapshot = items.snapshot()
+        items.add('c.')
+        items.add(builder.digit().repeat(1))
+        items.remove('car')
+        items.discard('none')
+        with self.assertRaises(KeyError):
+            items.remove('car')
+        self.assertEqual(items.compile(), '[ab]|c(?:\\.|a(?:t|rt))|dog?|[0-9]+')
+        self.assertEqual(snapshot.compile(), '[ab]|ca(?:t|rt?)|dog?')
+        self.assertEqual(len(items), 8)
+        self.assertTrue('cart' in items and builder.digit().repeat(1) in items and 'car' not in items)
+        self.assertEqual((builder.char('x') & items).reduce().compile(),
+                         'x(?:[ab]|c(?:\\.|a(?:t|rt))|dog?|[0-9]+)')
+        with self.assertRaises(TypeError):
+            snapshot.add('x')
+        self.assertEqual(loads(dumps(items)).compile(), items.compile())
+        Re2Validator(items.compile(RegexStyle.re2)).validate()
+        # the non-literal items are restored as is, not reduced again.
+        profiler = builder.alternation_set([
+            builder.lower_case_letter().ignore_case() | builder.string('zz') | builder.digit(), 'q']).instrument()
+        profiler.feed(['zz zz 1'])
+        reordered = profiler.reorder()
+        self.assertEqual(reordered.compile(), 'q|[A-Za-z\u0131\u017f\u212a]|zz|[0-9]')
+        self.assertEqual(loads(dumps(reordered)).compile(), reordered.compile())
+
+        # a empty set never matches, even in a concat.
+        items = builder.alternation_set(['bad'])
+        items.remove('bad')
+        self.assertEqual(items.count(), 0)
+        self.assertIsNone(re.search(items.compile(), 'bad'))
+        self.assertIsNone(re.search(items.compile(), ''))
+        self.assertFalse(items.to_predicate()(''))
+        expr = (builder.string('x') & items).reduce()
+        self.assertEqual(expr.count(), 0)
+        self.assertIsNone(re.search(expr.compile(), 'x'))
+        Re2Validator(expr.compile(RegexStyle.re2)).validate()
+
+        # composed exprs cache the analysis, so they compose a snapshot.
+        items = builder.alternation_set(['a'])
+        expr = items.repeat(0) & builder.char('b')
+        atomic = expr.compile(atomic=True)
+        tail = items & builder.char('y')
+        self.assertEqual(tail.count(), 1)
+        items.add('b')
+        items.add('z')
+        self.assertEqual(expr.compile(atomic=True), atomic)
+        self.assertEqual(tail.count(), 1)
+        expr = items.repeat(0) & builder.char('b')
+        self.assertTrue(re.fullmatch(expr.compile(atomic=True), 'ab'))
+        self.assertEqual((items & builder.char('y')).count(), 3)
+
+        random = __import__('random').Random(0)
+        words = set(''.join(random.choice('ab.-') for _ in range(random.randint(0, 6))) for _ in range(300))
+        items = builder.alternation_set(words)
+        for word in list(words)[:100]:
+            items.remove(word)
+            words.remove(word)
+        items.add('ab-ab-ab')
+        words.add('ab-ab-ab')
+        self.assertEqual(items.count(), len(words))
+        self.assertSetEqual(set(items), words)
+        fullmatch = re.compile(items.compile()).fullmatch
+        for text in words | set(''.join(random.choice('ab.-') for _ in range(random.randint(0, 7))) for _ in range(1000)):
+            self.assertEqual(bool(fullmatch(text)), text in words, text)
+
+    def test_predicate(self):
+        builder = RegexBuilder()
+        exprs = [
+            builder.int_range(0, 255),
+            builder.int_range(37, 10 ** 9),
+            builder.string('GET') | builder.string('POST'),
+            library.uuid(),
+            builder.string('id-') & builder.digit().repeat(4, 4) & builder.char_range(0x3B1, 0x3C9),
+            builder.char_range('a', 'f').repeat(2),
+            library.ipv4(),
+            # the last class is ASCII, the first one is not.
+            (builder.char(' ') | builder.char('Ā')) & builder.digit().repeat(6, 6),
+        ]
+        self.assertIn('text.isdigit()', exprs[1].to_predicate().source)
+        self.assertIn('translate', exprs[3].to_predicate().source)
+        self.assertFalse(hasattr(exprs[6].to_predicate(), 'source')) # fallback
+        self.assertIs(exprs[0].to_predicate(), exprs[0].to_predicate())
+        random = __import__('random').Random(0)
+        for expr in exprs:
+            predicate = expr.to_predicate()
+            fullmatch = re.compile(expr.reduce().compile()).fullmatch
+            texts = ['', '0', '00', '36', '37', '255', '256', '1000000000', '1000000001', '٣', 'id-0123α',
+                     ' 123456', 'Ā123456', 'Ā12345x']
+            texts += [''.join(random.choice('0123456789abcdef-.GETPOSidα') for _ in range(random.randint(1, 12)))
+                      for _ in range(2000)]
+            if expr.count() != math.inf:
+                texts += expr.sample(100, seed=0)
+            for text in texts:
+                self.assertEqual(bool(predicate(text)), bool(fullmatch(text)), (expr, text))
+
+    def test_unicode_category(self):
+        import unicodedata
+        builder = RegexBuilder()
+        letter = builder.unicode_category('L')
+        self.assertIs(letter, builder.unicode_category('L'))
+        pattern = re.compile(letter.reduce().compile())
+        for code in list(range(0x3000)) + [0x4E2D, 0x1F600, 0x20000]:
+            ch = chr(code)
+            self.assertEqual(bool(pattern.fullmatch(ch)), unicodedata.category(ch)[0] == 'L', hex(code))
+        # merged in interval form with other chars.
+        word = (builder.unicode_category('Nd') | builder.char('_') | builder.unicode_script('Latin')).reduce()
+        self.assertEqual(len(word._exprs), 1)
+        self.assertTrue(re.fullmatch(word.compile(), '٣'))
+        self.assertTrue(re.fullmatch(word.compile(), 'é'))
+        self.assertFalse(re.fullmatch(word.compile(), 'α'))
+        greek = builder.unicode_script('Greek') & builder.digit()
+        self.assertTrue(re.fullmatch(greek.reduce().compile(), 'Ω1'))
+        self.assertEqual(loads(dumps(greek.reduce())).compile(), greek.reduce().compile())
+        upper = builder.unicode_category('Lu').ignore_case().reduce()
+        self.assertEqual(len(upper._exprs), 1)
+        self.assertTrue(re.fullmatch(upper.compile(), 'ä'))
+        self.assertTrue(builder.unicode_script('Han').to_predicate()('中'))
+        self.assertRaises(UnsupportedSyntaxError, builder.unicode_script('Han').reduce().compile, RegexStyle.csharp)
+        self.assertRaises(ValueError, builder.unicode_category, 'Xx')
+        self.assertRaises(ValueError, builder.unicode_script, 'Klingon')
+
     def test_print(self):
         return
         import colorama